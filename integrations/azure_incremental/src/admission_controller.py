@@ -0,0 +1,74 @@
+import asyncio
+from types import TracebackType
+
+
+class AdmissionController:
+    """
+    Caps concurrent work like a semaphore, but with a limit that can change
+    while it is in use. The limit halves when the server throttles and grows
+    back by one after a full window of successful requests.
+
+    Each halving starts a new generation. A throttled request only halves the
+    limit if it was admitted in the current generation, so a burst of requests
+    throttled together halves it once rather than once per request.
+    """
+
+    def __init__(self, limit: int) -> None:
+        if limit < 1:
+            raise ValueError(f"limit must be positive, got {limit}")
+        self.max_limit: int = limit
+        self.limit: int = limit
+        self.active: int = 0
+        self.generation: int = 0
+        self._successes: int = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> int:
+        """Waits for a free slot and returns the generation it was taken in."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            return self.generation
+
+    async def release(self) -> None:
+        # The slot is freed right away, and waking a waiter is shielded so
+        # a cancelled caller can never leave the others waiting on it
+        self.active -= 1
+        await asyncio.shield(self._notify(1))
+
+    async def resize(self, limit: int) -> None:
+        self.limit = max(1, min(limit, self.max_limit))
+        self._successes = 0
+        await self._notify()
+
+    async def on_throttled(self, generation: int) -> None:
+        if generation != self.generation:
+            # Admitted before the last halving, which already accounted for it
+            return
+        self.generation += 1
+        await self.resize(self.limit // 2)
+
+    async def on_success(self) -> None:
+        if self.limit == self.max_limit:
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            await self.resize(self.limit + 1)
+
+    async def _notify(self, n: int | None = None) -> None:
+        async with self._condition:
+            if n is None:
+                self._condition.notify_all()
+            else:
+                self._condition.notify(n)
+
+    async def __aenter__(self) -> int:
+        return await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.release()
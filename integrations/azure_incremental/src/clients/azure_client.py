@@ -1,18 +1,30 @@
 import asyncio
+import os
+import time
+from pathlib import Path
 from typing import Any, AsyncGenerator, Self
 
+import orjson
 from azure.identity.aio import DefaultAzureCredential
 from azure.mgmt.resourcegraph.aio import ResourceGraphClient  # type: ignore
 from azure.mgmt.resourcegraph.models import (  # type: ignore
     QueryRequest,
     QueryRequestOptions,
     QueryResponse,
+    ResultFormat,
 )
 from azure.mgmt.subscription.aio import SubscriptionClient
 from azure.mgmt.subscription.models._models_py3 import Subscription
 from loguru import logger
 
 from src.rate_limiter import TokenBucketRateLimiter
+from src.settings import app_settings
+from src.utils import canonicalize_kql
+
+
+def _retrieve_exception(future: asyncio.Future[Any]) -> None:
+    if not future.cancelled():
+        future.exception()
 
 
 class AzureClient:
@@ -25,6 +37,11 @@ class AzureClient:
             capacity=250,
             refill_rate=25,
         )
+        # Resource Graph throttles per principal, so concurrent subscription
+        # batches share a cap on in-flight queries
+        self._query_semaphore = asyncio.Semaphore(
+            app_settings.ARG_MAX_CONCURRENT_QUERIES
+        )
 
     @staticmethod
     async def _handle_rate_limit(success: bool) -> None:
@@ -33,48 +50,151 @@ class AzureClient:
             await asyncio.sleep(1)
 
     async def get_all_subscriptions(self) -> list[Subscription]:
+        return [sub async for sub in self.iter_subscriptions()]
+
+    async def iter_subscriptions(self) -> AsyncGenerator[Subscription, None]:
+        """
+        Yields the subscriptions as Azure pages them in, so callers can start
+        working on the first ones before the listing completes.
+        """
         logger.info("Getting all Azure subscriptions")
         if not self.subs_client:
             raise ValueError("Azure client not initialized")
 
+        cached_subscriptions = self._read_subscriptions_cache()
+        if cached_subscriptions is not None:
+            logger.info(f"Found {len(cached_subscriptions)} subscriptions in the cache")
+            for sub in cached_subscriptions:
+                yield sub
+            return
+
         subscriptions: list[Subscription] = []
         async for sub in self.subs_client.subscriptions.list():
             await self._handle_rate_limit(self._rate_limiter.consume(1))
             subscriptions.append(sub)
+            yield sub
 
         logger.info(f"Found {len(subscriptions)} subscriptions in Azure")
-        return subscriptions
+        self._write_subscriptions_cache(subscriptions)
+
+    @staticmethod
+    def _read_subscriptions_cache() -> list[Subscription] | None:
+        """
+        Returns the subscriptions stored in SUBSCRIPTIONS_CACHE_FILE, or None
+        when caching is disabled or the cache is missing, stale or unreadable.
+        """
+        if not app_settings.SUBSCRIPTIONS_CACHE_FILE:
+            return None
+
+        cache_file = Path(app_settings.SUBSCRIPTIONS_CACHE_FILE)
+        try:
+            age = time.time() - cache_file.stat().st_mtime
+            if age > app_settings.SUBSCRIPTIONS_CACHE_TTL_SECONDS:
+                logger.info("Subscriptions cache expired")
+                return None
+            cached = orjson.loads(cache_file.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read subscriptions cache: {e}")
+            return None
+
+        if not isinstance(cached, dict) or not isinstance(
+            cached.get("subscriptions"), list
+        ):
+            logger.warning(
+                "Ignoring subscriptions cache: expected a JSON object with a "
+                "list of subscriptions"
+            )
+            return None
+
+        # The cache may be shared between integrations using other credentials
+        if (
+            cached.get("clientId") != app_settings.AZURE_CLIENT_ID
+            or cached.get("tenantId") != app_settings.AZURE_TENANT_ID
+        ):
+            return None
+        try:
+            return [Subscription.deserialize(sub) for sub in cached["subscriptions"]]
+        except Exception as e:
+            logger.warning(f"Ignoring subscriptions cache with invalid entries: {e}")
+            return None
+
+    @staticmethod
+    def _write_subscriptions_cache(subscriptions: list[Subscription]) -> None:
+        if not app_settings.SUBSCRIPTIONS_CACHE_FILE:
+            return
+
+        cache_file = Path(app_settings.SUBSCRIPTIONS_CACHE_FILE)
+        cached = {
+            "clientId": app_settings.AZURE_CLIENT_ID,
+            "tenantId": app_settings.AZURE_TENANT_ID,
+            "subscriptions": [
+                sub.serialize(keep_readonly=True) for sub in subscriptions
+            ],
+        }
+        try:
+            # Write then rename so concurrent runs never read a partial file
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            tmp_file.write_bytes(orjson.dumps(cached))
+            tmp_file.replace(cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to write subscriptions cache: {e}")
 
     async def run_query(
         self, query: str, subscriptions: list[str]
     ) -> AsyncGenerator[list[dict[str, Any]], None]:
         logger.info("Running query")
-        logger.debug(f"{query}")
         if not self.resource_g_client:
             raise ValueError("Azure client not initialized")
 
-        skip_token: str | None = None
+        # Equivalent requests are sent byte-identical, whatever the query
+        # layout or the order subscriptions were listed in
+        query = canonicalize_kql(query)
+        subscriptions = sorted(subscriptions)
+        logger.debug("{}", query)
 
-        while True:
-            query_request = QueryRequest(
-                subscriptions=subscriptions,
-                query=query,
-                options=QueryRequestOptions(
-                    skip_token=skip_token,
-                ),
-            )
-            await self._handle_rate_limit(self._rate_limiter.consume(1))
-            response: QueryResponse = await self.resource_g_client.resources(
-                query_request
-            )
+        # The next page is requested as soon as its skip token is known, so
+        # it downloads while the caller is still sending the current one.
+        next_page = asyncio.ensure_future(self._query_page(query, subscriptions))
+        try:
+            while True:
+                response = await next_page
+                logger.info("Query ran successfully")
+                skip_token = response.skip_token
+                if skip_token:
+                    logger.info("Fetching more data")
+                    next_page = asyncio.ensure_future(
+                        self._query_page(query, subscriptions, skip_token)
+                    )
+                yield response.data
+                if not skip_token:
+                    logger.info("No more data to fetch")
+                    break
+        finally:
+            # A prefetched page can still fail while it is being cancelled;
+            # reading its error keeps asyncio from reporting it as never
+            # retrieved
+            next_page.cancel()
+            next_page.add_done_callback(_retrieve_exception)
 
-            logger.info("Query ran successfully")
-            yield response.data
-            skip_token = response.skip_token
-            if not skip_token:
-                logger.info("No more data to fetch")
-                break
-            logger.info("Fetching more data")
+    async def _query_page(
+        self, query: str, subscriptions: list[str], skip_token: str | None = None
+    ) -> QueryResponse:
+        if not self.resource_g_client:
+            raise ValueError("Azure client not initialized")
+        query_request = QueryRequest(
+            subscriptions=subscriptions,
+            query=query,
+            options=QueryRequestOptions(
+                skip_token=skip_token,
+                top=app_settings.ARG_PAGE_SIZE,
+                result_format=ResultFormat.OBJECT_ARRAY,
+            ),
+        )
+        async with self._query_semaphore:
+            await self._handle_rate_limit(self._rate_limiter.consume(1))
+            return await self.resource_g_client.resources(query_request)
 
     async def __aenter__(self) -> Self:
         logger.info("Initializing Azure connection resources")
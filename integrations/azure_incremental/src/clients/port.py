@@ -1,11 +1,68 @@
-import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
 
 import httpx
+import orjson
 from loguru import logger
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
+from src.admission_controller import AdmissionController
 from src.settings import app_settings
 
+WEBHOOK_MAX_ATTEMPTS = 3
+WEBHOOK_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Upper bound for a server-provided Retry-After, so a single item cannot
+# stall its sync for minutes
+WEBHOOK_MAX_RETRY_AFTER_SECONDS = 30.0
+
+
+class TransientStatusError(Exception):
+    """Raised for webhook responses that are worth retrying."""
+
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"Webhook responded with status {response.status_code}")
+        self.response = response
+        self.retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), WEBHOOK_MAX_RETRY_AFTER_SECONDS)
+
+
+# Full jitter: each retry waits a random time below the exponential bound, so
+# items failing together do not retry together
+_backoff = wait_random_exponential(multiplier=0.2, max=5)
+
+
+def _wait_before_retry(retry_state: RetryCallState) -> float:
+    exception = retry_state.outcome.exception() if retry_state.outcome else None
+    if (
+        isinstance(exception, TransientStatusError)
+        and exception.retry_after is not None
+    ):
+        return exception.retry_after
+    return _backoff(retry_state)
+
 
 class PortClient:
     def __init__(
@@ -15,37 +72,90 @@ class PortClient:
         self.http_client = http_client
         self.webhook_ingest_url = app_settings.PORT_WEBHOOK_INGEST_URL
         self.webhook_secret = app_settings.PORT_WEBHOOK_SECRET
-        self.semaphore = asyncio.Semaphore(25)
+        # Shrinks when Port throttles and grows back once requests succeed
+        self.admission = AdmissionController(app_settings.PORT_MAX_CONCURRENT_REQUESTS)
 
     async def send_webhook_data(
         self, data: dict[str, Any], id: str, operation: str, type: str
-    ) -> None:
-        async with self.semaphore:
-            body_json = {
-                "data": data,
-                "operation": operation,
-                "type": type,
-            }
-
-            logger.info(
-                f"Sending {operation} request to webhook for type: {type}, id: {id}"
-            )
-            retries = 3
-            while retries > 0:
-                try:
-                    response = await self.http_client.post(
-                        self.webhook_ingest_url,
-                        json=body_json,
-                    )
+    ) -> bool:
+        body_json = {
+            "data": data,
+            "operation": operation,
+            "type": type,
+        }
+        return await self._post(body_json, f"type: {type}, id: {id}", operation)
+
+    async def send_webhook_bulk(
+        self, items: list[dict[str, Any]], operation: str, type: str
+    ) -> bool:
+        """
+        Sends several items sharing the same operation in a single request.
+        The webhook mapping should iterate them with `itemsToParse: .body.items`.
+        """
+        body_json = {
+            "items": items,
+            "operation": operation,
+            "type": type,
+        }
+        return await self._post(
+            body_json, f"type: {type}, items: {len(items)}", operation
+        )
+
+    async def _post(
+        self, body_json: dict[str, Any], description: str, operation: str
+    ) -> bool:
+        """
+        Returns whether the webhook accepted the request. Failures are logged
+        rather than raised, so one bad item does not abort the sync.
+        """
+        # orjson serializes the large query results considerably faster than
+        # the stdlib encoder httpx uses for `json=`; do it once, before retries.
+        content = orjson.dumps(body_json)
+        # Per-request lines are debug and formatted lazily, so the default
+        # INFO level builds no log strings for thousands of requests.
+        logger.debug("Sending {} request to webhook for {}", operation, description)
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(WEBHOOK_MAX_ATTEMPTS),
+                wait=_wait_before_retry,
+                retry=retry_if_exception_type(
+                    (httpx.TransportError, TransientStatusError)
+                ),
+                before_sleep=lambda state: logger.warning(
+                    "Retrying webhook request after: {}, operation: {}, {}",
+                    state.outcome.exception() if state.outcome else None,
+                    operation,
+                    description,
+                ),
+                reraise=True,
+            ):
+                # The slot is only held while the request is in flight, so a
+                # retrying item does not block other requests while it backs off
+                with attempt:
+                    async with self.admission as generation:
+                        response = await self.http_client.post(
+                            self.webhook_ingest_url,
+                            content=content,
+                            headers={"Content-Type": "application/json"},
+                        )
+                    if response.status_code == 429:
+                        await self.admission.on_throttled(generation)
+                    elif response.is_success:
+                        await self.admission.on_success()
+                    if response.status_code in WEBHOOK_RETRY_STATUS_CODES:
+                        raise TransientStatusError(response)
                     response.raise_for_status()
-                    logger.info(
-                        f"Successfully sent {operation} request to webhook for type: {type}, id: {id}"
-                    )
-                    break
-                except Exception as e:
-                    logger.error(
-                        f"Failed to send data to webhook: {e}, operation: {operation}, type: {type}, id: {id}"
-                    )
-                    logger.info("Retrying to send data to webhook")
-                    await asyncio.sleep(1)
-                    retries -= 1
+            logger.debug(
+                "Successfully sent {} request to webhook for {}",
+                operation,
+                description,
+            )
+            return True
+        except Exception as e:
+            logger.error(
+                "Failed to send data to webhook: {}, operation: {}, {}",
+                e,
+                operation,
+                description,
+            )
+            return False
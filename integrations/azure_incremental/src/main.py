@@ -1,5 +1,6 @@
 import asyncio
-from typing import Generator
+import sys
+from operator import attrgetter
 
 import httpx
 from azure.mgmt.subscription.models._models_py3 import Subscription
@@ -9,73 +10,117 @@ from src.clients.azure_client import AzureClient
 from src.clients.port import PortClient
 from src.services.resource_containers import ResourceContainers
 from src.services.resources import Resources
+from src.services.sent_changes import SentChanges
 from src.settings import SyncMode, app_settings
-from src.utils import turn_sequence_to_chunks
+from src.utils import turn_async_iterable_to_chunks
+
+_subscription_id = attrgetter("subscription_id")
+
+
+async def sync_subscriptions_batch(
+    subscriptions: list[Subscription],
+    resource_containers: ResourceContainers,
+    resources: Resources,
+) -> None:
+    subscription_ids = [
+        str(subscription_id)
+        for subscription_id in map(_subscription_id, subscriptions)
+        if subscription_id is not None
+    ]
+    # Containers and resources go to different blueprints and share no state,
+    # so both queries run at once and keep the webhook pool busy between them
+    async with asyncio.TaskGroup() as task_group:
+        if app_settings.SYNC_MODE == SyncMode.incremental:
+            logger.info("Running incremental sync")
+            task_group.create_task(
+                resource_containers.sync_incremental(subscription_ids)
+            )
+            task_group.create_task(resources.sync_incremental(subscription_ids))
+        else:
+            logger.info("Running full sync")
+            task_group.create_task(resource_containers.sync_full(subscription_ids))
+            task_group.create_task(resources.sync_full(subscription_ids))
 
 
 async def main() -> None:
     logger.info("Starting Azure to Port sync")
     async with (
-        httpx.AsyncClient(timeout=httpx.Timeout(20)) as client,
+        httpx.AsyncClient(
+            timeout=httpx.Timeout(20, connect=5),
+            # No transport-level retries: the PortClient already retries
+            # connection errors with backoff, and stacking both would multiply
+            # the attempts for an unreachable webhook
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                # Keep a warm connection for every request the PortClient may
+                # have in flight, so concurrent webhooks never wait on a handshake
+                limits=httpx.Limits(
+                    max_connections=app_settings.PORT_MAX_CONCURRENT_REQUESTS,
+                    max_keepalive_connections=app_settings.PORT_MAX_CONCURRENT_REQUESTS,
+                    # Outlive the pauses between query pages and subscription
+                    # batches, which are longer than httpx's 5 second default
+                    keepalive_expiry=30,
+                ),
+            ),
+        ) as client,
         AzureClient() as azure_client,
     ):
         port_client = PortClient(client)
+        sent_changes = (
+            SentChanges.load()
+            if app_settings.SYNC_MODE == SyncMode.incremental
+            else None
+        )
 
-        all_subscriptions = await azure_client.get_all_subscriptions()
-        logger.info(f"Discovered {len(all_subscriptions)} subscriptions")
-
-        if not all_subscriptions:
-            logger.error("No subscriptions found in Azure, exiting")
-            return
-
-        subscriptions_batches: Generator[list[Subscription], None, None] = (
-            turn_sequence_to_chunks(
-                all_subscriptions,
-                app_settings.SUBSCRIPTION_BATCH_SIZE,
-            )
+        resource_containers = ResourceContainers(
+            azure_client, port_client, sent_changes
+        )
+        resources = Resources(
+            azure_client, port_client, sent_changes, app_settings.RESOURCE_TYPES
         )
 
-        resource_containers = ResourceContainers(azure_client, port_client)
-        resources = Resources(azure_client, port_client)
+        semaphore = asyncio.Semaphore(app_settings.SUBSCRIPTION_BATCH_CONCURRENCY)
 
-        for subscriptions in subscriptions_batches:
-            if app_settings.SYNC_MODE == SyncMode.incremental:
-                logger.info("Running incremental sync")
-                await resource_containers.sync_incremental(
-                    [
-                        str(s.subscription_id)
-                        for s in subscriptions
-                        if s.subscription_id is not None
-                    ],
-                )
-                await resources.sync_incremental(
-                    [
-                        str(s.subscription_id)
-                        for s in subscriptions
-                        if s.subscription_id is not None
-                    ],
-                    app_settings.RESOURCE_TYPES,
-                )
-            else:
-                logger.info("Running full sync")
-                await resource_containers.sync_full(
-                    [
-                        str(s.subscription_id)
-                        for s in subscriptions
-                        if s.subscription_id is not None
-                    ],
-                )
-                await resources.sync_full(
-                    [
-                        str(s.subscription_id)
-                        for s in subscriptions
-                        if s.subscription_id is not None
-                    ],
-                    app_settings.RESOURCE_TYPES,
+        async def run_batch(subscriptions: list[Subscription]) -> None:
+            async with semaphore:
+                await sync_subscriptions_batch(
+                    subscriptions, resource_containers, resources
                 )
 
+        # Batches are scheduled as soon as enough subscriptions are listed, and
+        # together, so the Azure queries of one batch overlap with the webhook
+        # requests of another. A failing batch cancels the others.
+        discovered_subscriptions = 0
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                async for subscriptions in turn_async_iterable_to_chunks(
+                    azure_client.iter_subscriptions(),
+                    app_settings.SUBSCRIPTION_BATCH_SIZE,
+                ):
+                    discovered_subscriptions += len(subscriptions)
+                    task_group.create_task(run_batch(subscriptions))
+                logger.info(f"Discovered {discovered_subscriptions} subscriptions")
+        finally:
+            # Changes sent before a failure are kept, so the next run skips them
+            if sent_changes is not None:
+                sent_changes.save()
+
+        if not discovered_subscriptions:
+            logger.error("No subscriptions found in Azure, exiting")
+            return
+
     logger.success("Azure to Port sync completed")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Log lines are written by a background thread, so a slow stderr never
+    # blocks the event loop
+    logger.remove()
+    logger.add(sys.stderr, level=app_settings.LOG_LEVEL, enqueue=True)
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
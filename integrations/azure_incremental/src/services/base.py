@@ -0,0 +1,61 @@
+from loguru import logger
+
+from src.clients.azure_client import AzureClient
+from src.clients.port import PortClient
+from src.services.sent_changes import SentChanges
+from src.services.webhook import (
+    OperationResolver,
+    send_items_to_webhook,
+    webhook_task_pool,
+)
+
+
+class BaseSyncer:
+    """
+    Sends the rows of Resource Graph queries to the Port webhook as entities
+    of `webhook_type`. Subclasses only build the queries.
+    """
+
+    webhook_type: str
+    description: str
+    # Whether the items may be grouped into bulk requests when
+    # PORT_WEBHOOK_BATCH_SIZE is above 1
+    bulk_webhooks: bool = True
+
+    def __init__(
+        self,
+        azure_client: AzureClient,
+        port_client: PortClient,
+        sent_changes: SentChanges | None = None,
+    ):
+        self.azure_client = azure_client
+        self.port_client = port_client
+        self.sent_changes = sent_changes
+
+    async def _drive(
+        self,
+        query: str,
+        subscriptions: list[str],
+        get_operation: OperationResolver,
+        dedupe: bool = False,
+    ) -> None:
+        """
+        Sends the rows of `query` to the webhook. With `dedupe`, rows already
+        recorded in `self.sent_changes` are skipped.
+        """
+        sent_changes = self.sent_changes if dedupe else None
+        async with webhook_task_pool() as pool:
+            async for items in self.azure_client.run_query(query, subscriptions):
+                logger.info(f"Received batch of {len(items)} {self.description}")
+                if not items:
+                    logger.info(f"No {self.description} found in this batch")
+                    continue
+                await send_items_to_webhook(
+                    pool,
+                    self.port_client,
+                    items,
+                    self.webhook_type,
+                    get_operation,
+                    sent_changes,
+                    bulk=self.bulk_webhooks,
+                )
@@ -1,78 +1,74 @@
 import asyncio
+import functools
 
 from loguru import logger
 
 from src.clients.azure_client import AzureClient
 from src.clients.port import PortClient
+from src.services.base import BaseSyncer
+from src.services.sent_changes import SentChanges
+from src.services.webhook import change_operation, upsert_operation
 from src.settings import ResourceGroupTagFilters, app_settings
+from src.utils import build_tag_filter_clause, get_change_window_start
 
 
 def build_rg_tag_filter_clause_for_containers(filters: ResourceGroupTagFilters) -> str:
     """Build KQL where clause for resource container tag filtering with include/exclude logic."""
-    if not filters.has_filters():
-        return ""
-
-    conditions: list[str] = []
-
-    # Build include conditions (AND logic within include)
-    if filters.include:
-        include_conditions = []
-        for key, value in filters.include.items():
-            escaped_key = key.replace("'", "''")
-            escaped_value = value.replace("'", "''")
-            include_conditions.append(
-                f"tostring(tags['{escaped_key}']) =~ '{escaped_value}'"
-            )
-
-        if include_conditions:
-            include_clause = " and ".join(include_conditions)
-            conditions.append(f"({include_clause})")
-
-    # Build exclude conditions (OR logic within exclude, then NOT the whole thing)
-    if filters.exclude:
-        exclude_conditions = []
-        for key, value in filters.exclude.items():
-            escaped_key = key.replace("'", "''")
-            escaped_value = value.replace("'", "''")
-            exclude_conditions.append(
-                f"tostring(tags['{escaped_key}']) =~ '{escaped_value}'"
-            )
-
-        if exclude_conditions:
-            exclude_clause = " or ".join(exclude_conditions)
-            conditions.append(f"not ({exclude_clause})")
+    return build_tag_filter_clause(filters.include, filters.exclude, "tags")
 
-    if not conditions:
-        return ""
 
-    # Combine include and exclude with AND logic
-    combined_condition = " and ".join(conditions)
-    return f"| where {combined_condition}"
-
-
-def build_incremental_container_query() -> str:
+def build_incremental_container_query(deleted: bool = False) -> str:
+    """
+    Builds the query for the latest change of each container, either for the
+    deleted containers or for all the others.
+    """
     # Get resource group tag filters
     rg_tag_filters = app_settings.get_resource_group_tag_filters()
     rg_tag_filter_clause = build_rg_tag_filter_clause_for_containers(rg_tag_filters)
 
-    query = f"""
+    return _render_incremental_container_query(
+        get_change_window_start(app_settings.CHANGE_WINDOW_MINUTES),
+        rg_tag_filter_clause,
+        deleted,
+    )
+
+
+@functools.cache
+def _render_incremental_container_query(
+    change_window_start: str, rg_tag_filter_clause: str, deleted: bool
+) -> str:
+    latest_changes = f"""
     resourcecontainerchanges
     | extend changeTime = todatetime(properties.changeAttributes.timestamp)
-    | extend resourceType = tostring(properties.targetResourceType) 
-    | extend resourceId = tolower(properties.targetResourceId) 
-    | extend changeType = tostring(properties.changeType)
-    | extend changes = parse_json(properties.changes)
-    | extend changeAttributes = parse_json(properties.changeAttributes)
-    | project-away tags, name, type
-    | where changeTime > ago({app_settings.CHANGE_WINDOW_MINUTES}m)
+    | where changeTime > {change_window_start}
+    | project resourceId = tolower(properties.targetResourceId), changeType = tostring(properties.changeType), changeTime, subscriptionId, resourceGroup, changeResourceType = tolower(tostring(properties.targetResourceType))
     | summarize arg_max(changeTime, *) by resourceId
+    """
+
+    if deleted:
+        # Deleted containers are gone from the resourcecontainers table, so
+        # they skip that join and take their type from the change itself. They
+        # have no tags left either, so the tag filter is not applied to them.
+        query = f"""
+    {latest_changes}
+    | where changeType == "Delete"
+    | extend operation="delete", type=changeResourceType
+    | project subscriptionId, resourceGroup, resourceId, type, changeType, operation, changeTime
+    | order by changeTime asc
+    """
+        return query
+
+    query = f"""
+    {latest_changes}
+    | where changeType != "Delete"
+    | extend operation="upsert"
     | join kind=leftouter ( 
         resourcecontainers 
         | extend sourceResourceId=tolower(id) 
         | project sourceResourceId, type, name, location, tags, subscriptionId, resourceGroup 
     ) on $left.resourceId == $right.sourceResourceId 
     {rg_tag_filter_clause}
-    | project  subscriptionId, resourceGroup, resourceId , sourceResourceId, name, tags, type, location, changeType, changeTime
+    | project  subscriptionId, resourceGroup, resourceId , sourceResourceId, name, tags, type, location, changeType, operation, changeTime
     | order by changeTime asc
     """
     return query
@@ -83,6 +79,11 @@ def build_full_sync_container_query() -> str:
     rg_tag_filters = app_settings.get_resource_group_tag_filters()
     rg_tag_filter_clause = build_rg_tag_filter_clause_for_containers(rg_tag_filters)
 
+    return _render_full_sync_container_query(rg_tag_filter_clause)
+
+
+@functools.cache
+def _render_full_sync_container_query(rg_tag_filter_clause: str) -> str:
     query = f"""
     resourcecontainers 
     | extend resourceId=tolower(id) 
@@ -94,10 +95,20 @@ def build_full_sync_container_query() -> str:
     return query
 
 
-class ResourceContainers:
-    def __init__(self, azure_client: AzureClient, port_client: PortClient):
-        self.azure_client = azure_client
-        self.port_client = port_client
+class ResourceContainers(BaseSyncer):
+    webhook_type = "resourceContainer"
+    description = "resource containers"
+    # Resource groups and subscriptions come in the same pages, and the
+    # container mappings tell them apart by the type of each webhook body
+    bulk_webhooks = False
+
+    def __init__(
+        self,
+        azure_client: AzureClient,
+        port_client: PortClient,
+        sent_changes: SentChanges | None = None,
+    ):
+        super().__init__(azure_client, port_client, sent_changes)
 
         # Log resource group tag filtering configuration
         rg_tag_filters = app_settings.get_resource_group_tag_filters()
@@ -116,6 +127,17 @@ class ResourceContainers:
                 f"Resource container filtering enabled: {', '.join(filter_description)}"
             )
 
+        # The filters and the change window are fixed for the whole run, so
+        # every subscription batch reuses the same query strings
+        self._full_query = build_full_sync_container_query()
+        self._incremental_queries = [build_incremental_container_query()]
+        # A deleted container has no tags left, so it never matches include
+        # filters and only needs querying without them
+        if not rg_tag_filters.include:
+            self._incremental_queries.append(
+                build_incremental_container_query(deleted=True)
+            )
+
     async def sync_full(
         self,
         subscriptions: list[str],
@@ -125,28 +147,7 @@ class ResourceContainers:
             f"{len(subscriptions)} subscriptions"
         )
 
-        async for items in self.azure_client.run_query(
-            build_full_sync_container_query(),
-            subscriptions,
-        ):
-            logger.info(f"Received batch of {len(items)} resource containers")
-            if not items:
-                logger.info("No resources found in this batch")
-                continue
-            tasks = []
-            for item in items:
-                tasks.append(
-                    self.port_client.send_webhook_data(
-                        data=item,
-                        id=item["resourceId"],
-                        operation="upsert",
-                        type="resourceContainer",
-                    )
-                )
-                if len(tasks) == 100:
-                    await asyncio.gather(*tasks)
-                    tasks = []
-            await asyncio.gather(*tasks)
+        await self._drive(self._full_query, subscriptions, upsert_operation)
 
     async def sync_incremental(
         self,
@@ -162,29 +163,9 @@ class ResourceContainers:
             f"{len(subscriptions)} subscriptions"
         )
 
-        async for items in self.azure_client.run_query(
-            build_incremental_container_query(),
-            subscriptions,
-        ):
-            logger.info(
-                f"Received batch of {len(items)} resources containers operations"
-            )
-            if not items:
-                logger.info("No changes found in this batch")
-                continue
-            tasks = []
-            for item in items:
-                tasks.append(
-                    self.port_client.send_webhook_data(
-                        data=item,
-                        id=item["resourceId"],
-                        operation=(
-                            "upsert" if item["changeType"] != "Delete" else "delete"
-                        ),
-                        type="resourceContainer",
-                    )
+        # Deletes need no join, so their cheaper query runs alongside the other
+        async with asyncio.TaskGroup() as task_group:
+            for query in self._incremental_queries:
+                task_group.create_task(
+                    self._drive(query, subscriptions, change_operation, dedupe=True)
                 )
-                if len(tasks) == 100:
-                    await asyncio.gather(*tasks)
-                    tasks = []
-            await asyncio.gather(*tasks)
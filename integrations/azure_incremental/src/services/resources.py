@@ -1,93 +1,138 @@
 import asyncio
+import functools
 
 from loguru import logger
 
 from src.clients.azure_client import AzureClient
 from src.clients.port import PortClient
+from src.services.base import BaseSyncer
+from src.services.sent_changes import SentChanges
+from src.services.webhook import change_operation, upsert_operation
 from src.settings import ResourceGroupTagFilters, app_settings
+from src.utils import (
+    build_resource_type_filter,
+    build_tag_filter_clause,
+    get_change_window_start,
+)
 
 
 def build_rg_tag_filter_clause(filters: ResourceGroupTagFilters) -> str:
     """Build KQL where clause for resource group tag filtering with include/exclude logic."""
-    if not filters.has_filters():
-        return ""
-
-    conditions: list[str] = []
-
-    # Build include conditions (AND logic within include)
-    if filters.include:
-        include_conditions = []
-        for key, value in filters.include.items():
-            escaped_key = key.replace("'", "''")
-            escaped_value = value.replace("'", "''")
-            include_conditions.append(
-                f"tostring(rgTags['{escaped_key}']) =~ '{escaped_value}'"
-            )
-
-        if include_conditions:
-            include_clause = " and ".join(include_conditions)
-            conditions.append(f"({include_clause})")
-
-    # Build exclude conditions (OR logic within exclude, then NOT the whole thing)
-    if filters.exclude:
-        exclude_conditions = []
-        for key, value in filters.exclude.items():
-            escaped_key = key.replace("'", "''")
-            escaped_value = value.replace("'", "''")
-            exclude_conditions.append(
-                f"tostring(rgTags['{escaped_key}']) =~ '{escaped_value}'"
-            )
-
-        if exclude_conditions:
-            exclude_clause = " or ".join(exclude_conditions)
-            conditions.append(f"not ({exclude_clause})")
-
-    if not conditions:
-        return ""
-
-    # Combine include and exclude with AND logic
-    combined_condition = " and ".join(conditions)
-    return f"| where {combined_condition}"
-
-
-def build_incremental_query(resource_types: list[str] | None = None) -> str:
-    resource_type_filter = ""
-    if resource_types:
-        resource_types_filter = " or ".join(
-            [f"type == '{rt.lower()}'" for rt in resource_types]
-        )
-        resource_type_filter = f"| where {resource_types_filter}"
+    return build_tag_filter_clause(filters.include, filters.exclude, "rgTags")
+
+
+def build_resource_group_join(filters: ResourceGroupTagFilters) -> str:
+    """
+    Builds the join adding each row's resource group tags as `rgTags`, keeping
+    only the rows whose resource group passes the tag filters.
+    """
+    # Groups failing the include filters are dropped before the join, and the
+    # inner join then drops their resources
+    include_clause = build_tag_filter_clause(filters.include, {}, "tags")
+    join_kind = "inner" if filters.include else "leftouter"
+    # Excluded groups have to stay in the join, or their resources would get
+    # empty rgTags and pass this clause
+    exclude_clause = build_rg_tag_filter_clause(
+        ResourceGroupTagFilters(exclude=filters.exclude)
+    )
+    return f"""
+    | join kind={join_kind} (
+        resourcecontainers
+        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'
+        {include_clause}
+        | project rgName=tolower(name), rgTags=tags, rgSubscriptionId=subscriptionId
+    ) on $left.subscriptionId == $right.rgSubscriptionId and $left.resourceGroup == $right.rgName
+    {exclude_clause}
+    """
+
 
+def _resource_types_key(resource_types: list[str] | None) -> tuple[str, ...]:
+    # Types are matched case-insensitively and in any order, so listing the
+    # same types differently still renders, and caches, a single query
+    return tuple(sorted({rt.lower() for rt in resource_types or ()}))
+
+
+def build_incremental_query(
+    resource_types: list[str] | None = None, deleted: bool = False
+) -> str:
+    """
+    Builds the query for the latest change of each resource, either for the
+    deleted resources or for all the others.
+    """
     # Get resource group tag filters
     rg_tag_filters = app_settings.get_resource_group_tag_filters()
-    rg_tag_filter_clause = build_rg_tag_filter_clause(rg_tag_filters)
-
-    query = f"""
+    # Deleted resources are gone from the resources table, so they skip that
+    # join; their resource group is only joined to filter on its tags
+    resource_group_join = (
+        build_resource_group_join(rg_tag_filters)
+        if rg_tag_filters.has_filters() or not deleted
+        else ""
+    )
+
+    return _render_incremental_query(
+        get_change_window_start(app_settings.CHANGE_WINDOW_MINUTES),
+        _resource_types_key(resource_types),
+        resource_group_join,
+        app_settings.INCLUDE_CHANGED_PROPERTIES,
+        deleted,
+    )
+
+
+@functools.cache
+def _render_incremental_query(
+    change_window_start: str,
+    resource_types: tuple[str, ...],
+    resource_group_join: str,
+    include_changed_properties: bool,
+    deleted: bool,
+) -> str:
+    """
+    Renders the incremental query once per distinct set of inputs, so every
+    subscription batch of a sync sends the exact same KQL text.
+    """
+    resource_type_filter = build_resource_type_filter(resource_types)
+
+    # Only the columns read after the summarize are projected before it, so
+    # arg_max does not carry whole change records. The property deltas can be
+    # kilobytes per change, so they are only kept when the mapping needs them.
+    changed_properties = (
+        ", changedProperties=properties.changes" if include_changed_properties else ""
+    )
+    changed_properties_column = (
+        ", changedProperties" if include_changed_properties else ""
+    )
+
+    latest_changes = f"""
     resourcechanges 
     | extend changeTime=todatetime(properties.changeAttributes.timestamp)
-    | extend targetResourceId=tostring(properties.targetResourceId)
-    | extend changeType=tostring(properties.changeType)
-    | extend changedProperties=properties.changes
-    | project-away tags, name, type
-    | extend type=tostring(properties.targetResourceType)
-    | extend changeCount=properties.changeAttributes.changesCount 
-    | extend resourceId=tolower(targetResourceId) 
-    | where changeTime > ago({app_settings.CHANGE_WINDOW_MINUTES}m)
+    | where changeTime > {change_window_start}
+    | project resourceId=tolower(tostring(properties.targetResourceId)), type=tostring(properties.targetResourceType), changeType=tostring(properties.changeType), changeTime, subscriptionId, resourceGroup{changed_properties}
     {resource_type_filter}
     | summarize arg_max(changeTime, *) by resourceId
+    """
+    if deleted:
+        query = f"""
+    {latest_changes}
+    | where changeType == "Delete"
+    | extend operation="delete"
+    {resource_group_join}
+    | project subscriptionId, resourceGroup, resourceId, type, changeType, operation, changeTime{changed_properties_column}
+    | order by changeTime asc
+    """
+        return query
+
+    query = f"""
+    {latest_changes}
+    | where changeType != "Delete"
+    | extend operation="upsert"
     | join kind=leftouter ( 
         resources 
         | extend sourceResourceId=tolower(id) 
         | project sourceResourceId, name, location, tags, subscriptionId, resourceGroup 
         | extend resourceGroup=tolower(resourceGroup)
     ) on $left.resourceId == $right.sourceResourceId 
-    | join kind=leftouter (
-        resourcecontainers
-        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'
-        | project rgName=tolower(name), rgTags=tags, rgSubscriptionId=subscriptionId
-    ) on $left.subscriptionId == $right.rgSubscriptionId and $left.resourceGroup == $right.rgName
-    {rg_tag_filter_clause}
-    | project subscriptionId, resourceGroup, resourceId , sourceResourceId, name, tags, type, location, changeType, changeTime, changedProperties, rgTags
+    {resource_group_join}
+    | project subscriptionId, resourceGroup, resourceId , sourceResourceId, name, tags, type, location, changeType, operation, changeTime{changed_properties_column}, rgTags
     | order by changeTime asc
     """
 
@@ -95,16 +140,20 @@ def build_incremental_query(resource_types: list[str] | None = None) -> str:
 
 
 def build_full_sync_query(resource_types: list[str] | None = None) -> str:
-    resource_type_filter = ""
-    if resource_types:
-        resource_types_filter = " or ".join(
-            [f"type == '{rt}'" for rt in resource_types]
-        )
-        resource_type_filter = f"| where {resource_types_filter}"
-
     # Get resource group tag filters
     rg_tag_filters = app_settings.get_resource_group_tag_filters()
-    rg_tag_filter_clause = build_rg_tag_filter_clause(rg_tag_filters)
+
+    return _render_full_sync_query(
+        _resource_types_key(resource_types),
+        build_resource_group_join(rg_tag_filters),
+    )
+
+
+@functools.cache
+def _render_full_sync_query(
+    resource_types: tuple[str, ...], resource_group_join: str
+) -> str:
+    resource_type_filter = build_resource_type_filter(resource_types)
 
     query = f"""
     resources
@@ -113,22 +162,25 @@ def build_full_sync_query(resource_types: list[str] | None = None) -> str:
     | extend resourceGroup=tolower(resourceGroup)
     | extend type=tolower(type)
     {resource_type_filter}
-    | join kind=leftouter (
-        resourcecontainers
-        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'
-        | project rgName=tolower(name), rgTags=tags, rgSubscriptionId=subscriptionId
-    ) on $left.subscriptionId == $right.rgSubscriptionId and $left.resourceGroup == $right.rgName
-    {rg_tag_filter_clause}
+    {resource_group_join}
     | project resourceId, type, name, location, tags, subscriptionId, resourceGroup, rgTags
     """
 
     return query
 
 
-class Resources:
-    def __init__(self, azure_client: AzureClient, port_client: PortClient):
-        self.azure_client = azure_client
-        self.port_client = port_client
+class Resources(BaseSyncer):
+    webhook_type = "resource"
+    description = "resources"
+
+    def __init__(
+        self,
+        azure_client: AzureClient,
+        port_client: PortClient,
+        sent_changes: SentChanges | None = None,
+        resource_types: list[str] | None = None,
+    ):
+        super().__init__(azure_client, port_client, sent_changes)
 
         # Log resource group tag filtering configuration
         rg_tag_filters = app_settings.get_resource_group_tag_filters()
@@ -145,43 +197,28 @@ class Resources:
 
             logger.info(f"Resource filtering enabled: {', '.join(filter_description)}")
 
+        # The resource types, the filters and the change window are fixed for
+        # the whole run, so every subscription batch reuses the same queries
+        self._full_query = build_full_sync_query(resource_types)
+        self._incremental_queries = [
+            build_incremental_query(resource_types, deleted)
+            for deleted in (True, False)
+        ]
+
     async def sync_full(
         self,
         subscriptions: list[str],
-        resource_types: list[str] | None = None,
     ) -> None:
         logger.info(
             "Running query for subscription batch with "
             f"{len(subscriptions)} subscriptions"
         )
 
-        async for items in self.azure_client.run_query(
-            build_full_sync_query(resource_types),
-            subscriptions,
-        ):
-            logger.info(f"Received batch of {len(items)} resources")
-            if not items:
-                logger.info("No resources found in this batch")
-                continue
-            tasks = []
-            for item in items:
-                tasks.append(
-                    self.port_client.send_webhook_data(
-                        data=item,
-                        id=item["resourceId"],
-                        operation="upsert",
-                        type="resource",
-                    )
-                )
-                if len(tasks) == 100:
-                    await asyncio.gather(*tasks)
-                    tasks = []
-            await asyncio.gather(*tasks)
+        await self._drive(self._full_query, subscriptions, upsert_operation)
 
     async def sync_incremental(
         self,
         subscriptions: list[str],
-        resource_types: list[str] | None = None,
     ) -> None:
         """
         Processes the subscriptions in batches and runs the query
@@ -193,27 +230,10 @@ class Resources:
             f"{len(subscriptions)} subscriptions"
         )
 
-        async for items in self.azure_client.run_query(
-            build_incremental_query(resource_types),
-            subscriptions,
-        ):
-            logger.info(f"Received batch of {len(items)} resource operations")
-            if not items:
-                logger.info("No changes found in this batch")
-                continue
-            tasks = []
-            for item in items:
-                tasks.append(
-                    self.port_client.send_webhook_data(
-                        data=item,
-                        id=item["resourceId"],
-                        operation=(
-                            "upsert" if item["changeType"] != "Delete" else "delete"
-                        ),
-                        type="resource",
-                    )
+        # Deletes skip the resources join, so their cheaper query runs alongside
+        # the other
+        async with asyncio.TaskGroup() as task_group:
+            for query in self._incremental_queries:
+                task_group.create_task(
+                    self._drive(query, subscriptions, change_operation, dedupe=True)
                 )
-                if len(tasks) == 100:
-                    await asyncio.gather(*tasks)
-                    tasks = []
-            await asyncio.gather(*tasks)
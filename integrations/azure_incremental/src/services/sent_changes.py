@@ -0,0 +1,84 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Self
+
+import orjson
+from loguru import logger
+
+from src.settings import app_settings
+
+# Enough for the changes of several windows on large tenants, while keeping
+# the file small enough to read and write on every run
+SENT_CHANGES_MAX_SIZE = 50_000
+
+
+class SentChanges:
+    """
+    Remembers the last change sent to Port for each resource, so a run that
+    starts while a change is still inside the change window does not send it
+    again.
+    """
+
+    def __init__(
+        self,
+        change_times: dict[str, str] | None = None,
+        max_size: int = SENT_CHANGES_MAX_SIZE,
+    ) -> None:
+        self._change_times: OrderedDict[str, str] = OrderedDict(change_times or {})
+        self._max_size = max_size
+
+    def __len__(self) -> int:
+        return len(self._change_times)
+
+    def is_sent(self, item: dict[str, Any]) -> bool:
+        sent_change_time = self._change_times.get(item["resourceId"])
+        return sent_change_time is not None and sent_change_time == item["changeTime"]
+
+    def mark_sent(self, item: dict[str, Any]) -> None:
+        resource_id = item["resourceId"]
+        self._change_times[resource_id] = item["changeTime"]
+        self._change_times.move_to_end(resource_id)
+        while len(self._change_times) > self._max_size:
+            self._change_times.popitem(last=False)
+
+    @classmethod
+    def load(cls) -> Self | None:
+        """
+        Returns the changes stored in SENT_CHANGES_CACHE_FILE, or None when
+        the cache is disabled. A missing or unreadable file starts empty.
+        """
+        if not app_settings.SENT_CHANGES_CACHE_FILE:
+            return None
+
+        cache_file = Path(app_settings.SENT_CHANGES_CACHE_FILE)
+        try:
+            change_times = orjson.loads(cache_file.read_bytes())
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read sent changes cache: {e}")
+            return cls()
+
+        if not isinstance(change_times, dict):
+            logger.warning(
+                "Ignoring sent changes cache: expected a JSON object but got "
+                f"{type(change_times).__name__}"
+            )
+            return cls()
+
+        logger.info(f"Loaded {len(change_times)} sent changes from the cache")
+        return cls(change_times)
+
+    def save(self) -> None:
+        if not app_settings.SENT_CHANGES_CACHE_FILE:
+            return
+
+        cache_file = Path(app_settings.SENT_CHANGES_CACHE_FILE)
+        try:
+            # Write then rename so concurrent runs never read a partial file
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            tmp_file.write_bytes(orjson.dumps(self._change_times))
+            tmp_file.replace(cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to write sent changes cache: {e}")
@@ -0,0 +1,93 @@
+from typing import Any, Callable, Coroutine, Iterator
+
+from src.clients.port import PortClient
+from src.services.sent_changes import SentChanges
+from src.settings import app_settings
+from src.utils import BoundedTaskPool, turn_sequence_to_chunks
+
+OperationResolver = Callable[[dict[str, Any]], str]
+WebhookRequest = Coroutine[Any, Any, bool]
+
+
+def upsert_operation(item: dict[str, Any]) -> str:
+    return "upsert"
+
+
+def change_operation(item: dict[str, Any]) -> str:
+    return str(item["operation"])
+
+
+def _webhook_requests(
+    port_client: PortClient,
+    items: list[dict[str, Any]],
+    type: str,
+    get_operation: OperationResolver,
+    bulk: bool,
+) -> Iterator[tuple[list[dict[str, Any]], WebhookRequest]]:
+    """Yields each request along with the items it sends."""
+    batch_size = app_settings.PORT_WEBHOOK_BATCH_SIZE if bulk else 1
+    if batch_size <= 1:
+        # Bound once, as this runs for every item of every page
+        send_webhook_data = port_client.send_webhook_data
+        for item in items:
+            yield (
+                [item],
+                send_webhook_data(
+                    data=item,
+                    id=item["resourceId"],
+                    operation=get_operation(item),
+                    type=type,
+                ),
+            )
+        return
+
+    items_by_operation: dict[str, list[dict[str, Any]]] = {}
+    for item in items:
+        items_by_operation.setdefault(get_operation(item), []).append(item)
+
+    for operation, operation_items in items_by_operation.items():
+        for chunk in turn_sequence_to_chunks(operation_items, batch_size):
+            yield chunk, port_client.send_webhook_bulk(chunk, operation, type)
+
+
+def webhook_task_pool() -> BoundedTaskPool:
+    # Twice the client's concurrency keeps its admission slots saturated without
+    # creating a task per item up front
+    return BoundedTaskPool(2 * app_settings.PORT_MAX_CONCURRENT_REQUESTS)
+
+
+async def _record_sent(
+    request: WebhookRequest, items: list[dict[str, Any]], sent_changes: SentChanges
+) -> None:
+    if await request:
+        for item in items:
+            sent_changes.mark_sent(item)
+
+
+async def send_items_to_webhook(
+    pool: BoundedTaskPool,
+    port_client: PortClient,
+    items: list[dict[str, Any]],
+    type: str,
+    get_operation: OperationResolver,
+    sent_changes: SentChanges | None = None,
+    bulk: bool = True,
+) -> None:
+    """
+    Submits the items' webhook requests to the pool, one request per item or,
+    when `bulk` is set and PORT_WEBHOOK_BATCH_SIZE is above 1, one request per
+    chunk of items sharing the same operation. Returns once the last request is scheduled,
+    so the caller can fetch the next page while these are still being sent.
+    Changes found in sent_changes are skipped, and the others are recorded
+    there once Port accepts them.
+    """
+    if sent_changes is not None:
+        items = [item for item in items if not sent_changes.is_sent(item)]
+
+    for request_items, request in _webhook_requests(
+        port_client, items, type, get_operation, bulk
+    ):
+        if sent_changes is not None:
+            await pool.submit(_record_sent(request, request_items, sent_changes))
+        else:
+            await pool.submit(request)
@@ -1,8 +1,9 @@
-import json
 from enum import StrEnum
 from typing import Dict, Optional
 
+import orjson
 from loguru import logger
+from pydantic import Field, PrivateAttr
 from pydantic_settings import BaseSettings
 
 
@@ -39,29 +40,58 @@ class ResourceGroupTagFilters:
 class _AppSettings(BaseSettings):
     AZURE_CLIENT_ID: str
     AZURE_CLIENT_SECRET: str
+    AZURE_TENANT_ID: Optional[str] = None
     PORT_WEBHOOK_INGEST_URL: str
     PORT_WEBHOOK_SECRET: str = "azure-incremental"
+    PORT_MAX_CONCURRENT_REQUESTS: int = Field(25, ge=1)
+    PORT_WEBHOOK_BATCH_SIZE: int = 1
     SUBSCRIPTION_BATCH_SIZE: int = 1000
+    SUBSCRIPTION_BATCH_CONCURRENCY: int = Field(2, ge=1)
+    ARG_MAX_CONCURRENT_QUERIES: int = Field(4, ge=1)
+    # 1000 is the largest page Resource Graph serves
+    ARG_PAGE_SIZE: int = Field(1000, ge=1, le=1000)
+    SUBSCRIPTIONS_CACHE_FILE: Optional[str] = None
+    SUBSCRIPTIONS_CACHE_TTL_SECONDS: int = 900
     CHANGE_WINDOW_MINUTES: int = 15
+    SENT_CHANGES_CACHE_FILE: Optional[str] = None
+    INCLUDE_CHANGED_PROPERTIES: bool = False
+    LOG_LEVEL: str = "INFO"
     SYNC_MODE: SyncMode = SyncMode.incremental
     RESOURCE_TYPES: Optional[list[str]] = None
     RESOURCE_GROUP_TAG_FILTERS: Optional[str] = None  # JSON string
 
+    # The raw RESOURCE_GROUP_TAG_FILTERS last parsed, and its parsed filters
+    _rg_tag_filters_cache: Optional[tuple[str, ResourceGroupTagFilters]] = PrivateAttr(
+        default=None
+    )
+
     def get_resource_group_tag_filters(self) -> ResourceGroupTagFilters:
         """
         Converts RESOURCE_GROUP_TAG_FILTERS JSON string into a ResourceGroupTagFilters object.
         Returns an empty object if parsing or validation fails.
+        The JSON is only parsed again when RESOURCE_GROUP_TAG_FILTERS changes.
         """
-        if not self.RESOURCE_GROUP_TAG_FILTERS:
+        raw_filters = self.RESOURCE_GROUP_TAG_FILTERS
+        if not raw_filters:
             return ResourceGroupTagFilters()
 
-        parsed = self._parse_json(self.RESOURCE_GROUP_TAG_FILTERS)
+        if self._rg_tag_filters_cache and self._rg_tag_filters_cache[0] == raw_filters:
+            return self._rg_tag_filters_cache[1]
+
+        filters = self._parse_resource_group_tag_filters(raw_filters)
+        self._rg_tag_filters_cache = (raw_filters, filters)
+        return filters
+
+    def _parse_resource_group_tag_filters(
+        self, raw_filters: str
+    ) -> ResourceGroupTagFilters:
+        parsed = self._parse_json(raw_filters)
         if parsed is None:
             return ResourceGroupTagFilters()
 
         if not self._is_valid_filter_structure(parsed):
             logger.warning(
-                f"Invalid structure in RESOURCE_GROUP_TAG_FILTERS: {self.RESOURCE_GROUP_TAG_FILTERS}. "
+                f"Invalid structure in RESOURCE_GROUP_TAG_FILTERS: {raw_filters}. "
                 "Expected JSON object with string key-value pairs in 'include' and/or 'exclude'."
             )
             return ResourceGroupTagFilters()
@@ -74,13 +104,13 @@ class _AppSettings(BaseSettings):
     def _parse_json(self, raw_json: str) -> Optional[FilterJSON]:
         """Parses a JSON string and returns a dict if valid."""
         try:
-            data = json.loads(raw_json)
+            data = orjson.loads(raw_json)
             if isinstance(data, dict):
                 return data
             logger.warning(
                 f"Expected a JSON object in RESOURCE_GROUP_TAG_FILTERS but got: {type(data).__name__}"
             )
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(
                 f"Failed to parse RESOURCE_GROUP_TAG_FILTERS: {raw_json}. Error: {e}"
             )
@@ -1,20 +1,184 @@
-from typing import Generator, TypeVar
+import asyncio
+import functools
+import itertools
+import re
+from datetime import datetime, timedelta, timezone
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Coroutine,
+    Generator,
+    Iterable,
+    Mapping,
+    Self,
+    Sequence,
+    TypeVar,
+)
 
 T = TypeVar("T")
 
+# String literals are matched first so their contents are left untouched;
+# any other run of whitespace and // comments collapses to one space.
+_KQL_TOKEN = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|(?:\s|//[^\n]*)+""")
+
 
 def turn_sequence_to_chunks(
-    sequence: list[T], chunk_size: int
+    sequence: Iterable[T], chunk_size: int
 ) -> Generator[list[T], None, None]:
-    if chunk_size >= len(sequence):
-        yield sequence
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+
+    if isinstance(sequence, list):
+        if chunk_size >= len(sequence):
+            yield sequence
+            return
+        for start in range(0, len(sequence), chunk_size):
+            yield sequence[start : start + chunk_size]
         return
 
-    start, end = 0, chunk_size
+    # Other iterables are consumed lazily, without materializing them first
+    iterator = iter(sequence)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
+
+
+async def turn_async_iterable_to_chunks(
+    iterable: AsyncIterable[T], chunk_size: int
+) -> AsyncGenerator[list[T], None]:
+    chunk: list[T] = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+@functools.cache
+def get_change_window_start(change_window_minutes: int) -> str:
+    """
+    Returns the start of the change window as a KQL datetime literal, floored
+    to the minute. It is computed once per run, so every subscription batch
+    queries the same window with byte-identical query text.
+    """
+    start = datetime.now(timezone.utc) - timedelta(minutes=change_window_minutes)
+    return f"datetime({start.replace(second=0, microsecond=0):%Y-%m-%dT%H:%M:%SZ})"
+
+
+def canonicalize_kql(query: str) -> str:
+    """
+    Collapses whitespace and comments outside string literals, so queries
+    that only differ in layout are sent as the same text.
+    """
+    return _KQL_TOKEN.sub(
+        lambda match: match.group(0) if match.group(0)[0] in "'\"" else " ",
+        query,
+    ).strip()
+
+
+_TAG_CONDITION = "tostring({}['{}']) =~ '{}'".format
+
+
+def _escape_kql_string(value: str) -> str:
+    return value.replace("'", "''")
+
+
+def build_tag_filter_clause(
+    include: Mapping[str, str], exclude: Mapping[str, str], tags_column: str
+) -> str:
+    """
+    Builds a KQL where clause keeping rows whose `tags_column` matches every
+    include tag and none of the exclude tags. Returns "" without filters.
+    """
+    return _render_tag_filter_clause(
+        tuple(include.items()), tuple(exclude.items()), tags_column
+    )
+
+
+@functools.cache
+def _render_tag_filter_clause(
+    include: tuple[tuple[str, str], ...],
+    exclude: tuple[tuple[str, str], ...],
+    tags_column: str,
+) -> str:
+    # Keyed on the tags in their configured order, so the clause text never
+    # depends on set iteration order
+    conditions: list[str] = []
+    if include:
+        include_clause = " and ".join(
+            _TAG_CONDITION(tags_column, _escape_kql_string(k), _escape_kql_string(v))
+            for k, v in include
+        )
+        conditions.append(f"({include_clause})")
+    if exclude:
+        exclude_clause = " or ".join(
+            _TAG_CONDITION(tags_column, _escape_kql_string(k), _escape_kql_string(v))
+            for k, v in exclude
+        )
+        conditions.append(f"not ({exclude_clause})")
+
+    if not conditions:
+        return ""
+    return f"| where {' and '.join(conditions)}"
+
+
+def build_resource_type_filter(resource_types: Sequence[str]) -> str:
+    """
+    Builds a KQL where clause keeping rows whose type is one of
+    `resource_types`, compared case-insensitively. Returns "" without types.
+    """
+    if not resource_types:
+        return ""
+    types_csv = ", ".join(f"'{_escape_kql_string(rt)}'" for rt in resource_types)
+    return f"| where type in~ ({types_csv})"
+
+
+class BoundedTaskPool:
+    """
+    Runs coroutines as tasks with at most `limit` of them in flight. `submit`
+    only waits when the pool is full, so callers keep producing work while
+    earlier tasks run. Leaving the pool waits for the remaining tasks; the
+    first exception cancels them instead, and waits for them to unwind.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._in_flight: set[asyncio.Task[Any]] = set()
+
+    async def submit(self, coroutine: Coroutine[Any, Any, Any]) -> None:
+        try:
+            while len(self._in_flight) >= self._limit:
+                done, self._in_flight = await asyncio.wait(
+                    self._in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+        except BaseException:
+            coroutine.close()
+            raise
+        self._in_flight.add(asyncio.create_task(coroutine))
 
-    while start <= len(sequence) and sequence[start:end]:
-        yield sequence[start:end]
-        start += chunk_size
-        end += chunk_size
+    async def __aenter__(self) -> Self:
+        return self
 
-    return
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            if exc_type is None and self._in_flight:
+                await asyncio.gather(*self._in_flight)
+        finally:
+            tasks, self._in_flight = self._in_flight, set()
+            for task in tasks:
+                task.cancel()
+            # Let the cancelled tasks run their cleanup before the caller
+            # moves on, and retrieve their exceptions
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
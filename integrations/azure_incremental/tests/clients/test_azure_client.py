@@ -1,7 +1,11 @@
+import asyncio
+import gc
+from pathlib import Path
 from typing import Any, AsyncGenerator
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from azure.mgmt.subscription.models._models_py3 import Subscription
 
 from src.clients.azure_client import AzureClient
 
@@ -26,6 +30,13 @@ class TestAzureClient:
         assert client.resource_g_client is None
         assert client._rate_limiter is not None
 
+    def test_init_query_semaphore_uses_settings(self) -> None:
+        """Test that the query semaphore follows ARG_MAX_CONCURRENT_QUERIES."""
+        with patch("src.clients.azure_client.app_settings") as mock_settings:
+            mock_settings.ARG_MAX_CONCURRENT_QUERIES = 3
+            client = AzureClient()
+        assert client._query_semaphore._value == 3
+
     @pytest.mark.asyncio
     async def test_context_manager_enter(self, mock_client: AzureClient) -> None:
         """Test context manager enter."""
@@ -79,6 +90,96 @@ class TestAzureClient:
         assert subscriptions[0].subscription_id == "sub-1"
         assert subscriptions[1].subscription_id == "sub-2"
 
+    @pytest.mark.asyncio
+    async def test_get_all_subscriptions_uses_cache_file(
+        self, mock_client: AzureClient, tmp_path: Path
+    ) -> None:
+        """Test that subscriptions are cached in SUBSCRIPTIONS_CACHE_FILE."""
+
+        async def async_iter() -> AsyncGenerator[Subscription, Any]:
+            yield Subscription.deserialize(
+                {"subscriptionId": "sub-1", "displayName": "Test Sub 1"}
+            )
+
+        list_subscriptions = MagicMock(side_effect=async_iter)
+        mock_client.subs_client.subscriptions.list = list_subscriptions  # type: ignore
+
+        with patch("src.clients.azure_client.app_settings") as mock_settings:
+            mock_settings.SUBSCRIPTIONS_CACHE_FILE = str(tmp_path / "subs.json")
+            mock_settings.SUBSCRIPTIONS_CACHE_TTL_SECONDS = 900
+            mock_settings.AZURE_CLIENT_ID = "client-id"
+            mock_settings.AZURE_TENANT_ID = "tenant-id"
+
+            first = await mock_client.get_all_subscriptions()
+            second = await mock_client.get_all_subscriptions()
+
+            # A different service principal must not reuse the cache
+            mock_settings.AZURE_CLIENT_ID = "other-client-id"
+            await mock_client.get_all_subscriptions()
+
+            # Nor the same app registration in another tenant
+            mock_settings.AZURE_TENANT_ID = "other-tenant-id"
+            await mock_client.get_all_subscriptions()
+
+        assert list_subscriptions.call_count == 3
+        assert [s.subscription_id for s in first] == ["sub-1"]
+        assert [s.subscription_id for s in second] == ["sub-1"]
+        assert second[0].display_name == "Test Sub 1"
+
+    @pytest.mark.asyncio
+    async def test_get_all_subscriptions_expired_cache(
+        self, mock_client: AzureClient, tmp_path: Path
+    ) -> None:
+        """Test that an expired cache file is ignored."""
+        cache_file = tmp_path / "subs.json"
+        cache_file.write_text(
+            '{"clientId": "client-id", "tenantId": "tenant-id", "subscriptions": [{"subscriptionId": "old"}]}'
+        )
+
+        async def async_iter() -> AsyncGenerator[Subscription, Any]:
+            yield Subscription.deserialize({"subscriptionId": "sub-1"})
+
+        mock_client.subs_client.subscriptions.list = lambda: async_iter()  # type: ignore
+
+        with patch("src.clients.azure_client.app_settings") as mock_settings:
+            mock_settings.SUBSCRIPTIONS_CACHE_FILE = str(cache_file)
+            mock_settings.SUBSCRIPTIONS_CACHE_TTL_SECONDS = 0
+            mock_settings.AZURE_CLIENT_ID = "client-id"
+            mock_settings.AZURE_TENANT_ID = "tenant-id"
+
+            subscriptions = await mock_client.get_all_subscriptions()
+
+        assert [s.subscription_id for s in subscriptions] == ["sub-1"]
+
+    @pytest.mark.asyncio
+    async def test_get_all_subscriptions_invalid_cache(
+        self, mock_client: AzureClient, tmp_path: Path
+    ) -> None:
+        """Test that a cache file with unexpected content is ignored."""
+        cache_file = tmp_path / "subs.json"
+
+        async def async_iter() -> AsyncGenerator[Subscription, Any]:
+            yield Subscription.deserialize({"subscriptionId": "sub-1"})
+
+        mock_client.subs_client.subscriptions.list = lambda: async_iter()  # type: ignore
+
+        for content in (
+            "[]",
+            "1",
+            '{"clientId": "client-id", "tenantId": "tenant-id"}',
+            '{"clientId": "client-id", "tenantId": "tenant-id", "subscriptions": [1]}',
+        ):
+            cache_file.write_text(content)
+            with patch("src.clients.azure_client.app_settings") as mock_settings:
+                mock_settings.SUBSCRIPTIONS_CACHE_FILE = str(cache_file)
+                mock_settings.SUBSCRIPTIONS_CACHE_TTL_SECONDS = 900
+                mock_settings.AZURE_CLIENT_ID = "client-id"
+                mock_settings.AZURE_TENANT_ID = "tenant-id"
+
+                subscriptions = await mock_client.get_all_subscriptions()
+
+            assert [s.subscription_id for s in subscriptions] == ["sub-1"]
+
     @pytest.mark.asyncio
     async def test_get_all_subscriptions_no_client(self) -> None:
         """Test getting subscriptions without initialized client."""
@@ -108,6 +209,25 @@ class TestAzureClient:
         assert results[0]["id"] == "resource-1"
         assert results[1]["id"] == "resource-2"
 
+    @pytest.mark.asyncio
+    async def test_run_query_canonicalizes_request(
+        self, mock_client: AsyncMock
+    ) -> None:
+        """Test that the query text and subscriptions are normalized."""
+        mock_response = MagicMock()
+        mock_response.data = []
+        mock_response.skip_token = None
+        mock_client.resource_g_client.resources.return_value = mock_response
+
+        async for _ in mock_client.run_query(
+            "\n    resources\n    | where type == 'a  b'\n", ["sub-2", "sub-1"]
+        ):
+            pass
+
+        request = mock_client.resource_g_client.resources.call_args[0][0]
+        assert request.query == "resources | where type == 'a  b'"
+        assert request.subscriptions == ["sub-1", "sub-2"]
+
     @pytest.mark.asyncio
     async def test_run_query_with_skip_token(self, mock_client: AsyncMock) -> None:
         """Test running a query with skip token for pagination."""
@@ -140,6 +260,83 @@ class TestAzureClient:
         # Verify QueryRequest was called twice with different skip tokens
         assert mock_client.resource_g_client.resources.call_count == 2
 
+    @pytest.mark.asyncio
+    async def test_run_query_prefetches_next_page(self, mock_client: AsyncMock) -> None:
+        """Test that the next page is requested before the current one is consumed."""
+        mock_response1 = MagicMock()
+        mock_response1.data = [{"id": "resource-1"}]
+        mock_response1.skip_token = "skip-token-1"
+
+        mock_response2 = MagicMock()
+        mock_response2.data = [{"id": "resource-2"}]
+        mock_response2.skip_token = None
+
+        mock_client.resource_g_client.resources.side_effect = [
+            mock_response1,
+            mock_response2,
+        ]
+
+        pages = mock_client.run_query("resources", ["sub-1"])
+        assert await anext(pages) == [{"id": "resource-1"}]
+        await asyncio.sleep(0)
+
+        assert mock_client.resource_g_client.resources.call_count == 2
+        second_request = mock_client.resource_g_client.resources.call_args[0][0]
+        assert second_request.options.skip_token == "skip-token-1"
+        assert second_request.options.top == 1000
+        assert await anext(pages) == [{"id": "resource-2"}]
+        await pages.aclose()
+
+    @pytest.mark.asyncio
+    async def test_run_query_closed_with_failing_prefetch(
+        self, mock_client: AsyncMock
+    ) -> None:
+        """Test that a prefetched page failing on cancellation is not reported."""
+        mock_response = MagicMock()
+        mock_response.data = [{"id": "resource-1"}]
+        mock_response.skip_token = "skip-token-1"
+
+        async def query_pages(request: Any) -> MagicMock:
+            if request.options.skip_token is None:
+                return mock_response
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                raise RuntimeError("page failed while cancelled")
+            return mock_response
+
+        mock_client.resource_g_client.resources.side_effect = query_pages
+        loop = asyncio.get_running_loop()
+        unhandled: list[dict[str, Any]] = []
+        loop.set_exception_handler(lambda _, context: unhandled.append(context))
+
+        pages = mock_client.run_query("resources", ["sub-1"])
+        assert await anext(pages) == [{"id": "resource-1"}]
+        await asyncio.sleep(0)
+        await pages.aclose()
+        del pages
+        for _ in range(3):
+            await asyncio.sleep(0)
+        gc.collect()
+
+        loop.set_exception_handler(None)
+        assert unhandled == []
+
+    @pytest.mark.asyncio
+    async def test_query_page_size(self, mock_client: AsyncMock) -> None:
+        """Test that pages request ARG_PAGE_SIZE rows."""
+        mock_response = MagicMock()
+        mock_response.data = []
+        mock_response.skip_token = None
+        mock_client.resource_g_client.resources.return_value = mock_response
+
+        with patch("src.clients.azure_client.app_settings") as mock_settings:
+            mock_settings.ARG_PAGE_SIZE = 200
+            await mock_client._query_page("resources", ["sub-1"])
+
+        request = mock_client.resource_g_client.resources.call_args[0][0]
+        assert request.options.top == 200
+
     @pytest.mark.asyncio
     async def test_run_query_no_client(self) -> None:
         """Test running query without initialized client."""
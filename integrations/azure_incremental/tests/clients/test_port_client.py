@@ -2,12 +2,17 @@
 
 import asyncio
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
+import orjson
 import pytest
 
-from src.clients.port import PortClient
+from src.clients.port import (
+    WEBHOOK_MAX_RETRY_AFTER_SECONDS,
+    PortClient,
+    _parse_retry_after,
+)
 
 
 class TestPortClient:
@@ -29,7 +34,14 @@ class TestPortClient:
         assert client.http_client == mock_http_client
         assert client.webhook_ingest_url is not None
         assert client.webhook_secret is not None
-        assert client.semaphore is not None
+        assert client.admission is not None
+
+    def test_init_admission_uses_settings(self, mock_http_client: AsyncMock) -> None:
+        """Test that the admission limit follows PORT_MAX_CONCURRENT_REQUESTS."""
+        with patch("src.clients.port.app_settings") as mock_settings:
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 3
+            client = PortClient(mock_http_client)
+        assert client.admission.limit == 3
 
     @pytest.mark.asyncio
     async def test_send_webhook_data_success(
@@ -53,60 +65,165 @@ class TestPortClient:
         assert call_args[0][0] == port_client.webhook_ingest_url
 
         # Verify request body
-        request_body = call_args[1]["json"]
+        request_body = orjson.loads(call_args[1]["content"])
+        assert call_args[1]["headers"]["Content-Type"] == "application/json"
         assert request_body["data"] == data
         assert request_body["operation"] == "upsert"
         assert request_body["type"] == "resource"
 
     @pytest.mark.asyncio
-    async def test_send_webhook_data_with_retries(
+    async def test_send_webhook_bulk_success(
         self, port_client: PortClient, mock_http_client: AsyncMock
     ) -> None:
-        """Test webhook data sending with retries on failure."""
-        # Mock failed response first, then success
-        mock_failed_response = MagicMock()
-        mock_failed_response.raise_for_status.side_effect = httpx.HTTPError(
-            "Connection error"
-        )
+        """Test sending several items in a single webhook request."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status.return_value = None
+        mock_http_client.post.return_value = mock_response
+
+        items = [{"resourceId": "a"}, {"resourceId": "b"}]
 
-        mock_success_response = MagicMock()
-        mock_success_response.raise_for_status.return_value = None
+        await port_client.send_webhook_bulk(items, "delete", "resource")
+
+        mock_http_client.post.assert_called_once()
+        request_body = orjson.loads(mock_http_client.post.call_args[1]["content"])
+        assert request_body == {
+            "items": items,
+            "operation": "delete",
+            "type": "resource",
+        }
 
+    @pytest.mark.asyncio
+    async def test_send_webhook_data_with_retries(
+        self, port_client: PortClient, mock_http_client: AsyncMock
+    ) -> None:
+        """Test webhook data sending with retries on transient failures."""
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
         mock_http_client.post.side_effect = [
-            mock_failed_response,
-            mock_success_response,
+            httpx.ConnectError("Connection error", request=request),
+            httpx.Response(503, request=request),
+            httpx.Response(200, request=request),
         ]
 
         data = {"id": "test-resource", "name": "Test Resource"}
 
-        await port_client.send_webhook_data(
-            data=data, id="test-id", operation="upsert", type="resource"
-        )
+        with patch("src.clients.port._backoff", return_value=0):
+            sent = await port_client.send_webhook_data(
+                data=data, id="test-id", operation="upsert", type="resource"
+            )
 
-        # Verify HTTP client was called twice (retry)
-        assert mock_http_client.post.call_count == 2
+        assert sent is True
+        # Verify HTTP client was called three times (two retries)
+        assert mock_http_client.post.call_count == 3
 
     @pytest.mark.asyncio
     async def test_send_webhook_data_max_retries_exceeded(
         self, port_client: PortClient, mock_http_client: AsyncMock
     ) -> None:
         """Test webhook data sending when max retries are exceeded."""
-        # Mock failed responses
-        mock_failed_response = MagicMock()
-        mock_failed_response.raise_for_status.side_effect = httpx.HTTPError(
-            "Connection error"
-        )
-        mock_http_client.post.return_value = mock_failed_response
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
+        mock_http_client.post.return_value = httpx.Response(502, request=request)
 
         data = {"id": "test-resource", "name": "Test Resource"}
 
         # Should not raise exception, just log error
+        with patch("src.clients.port._backoff", return_value=0):
+            sent = await port_client.send_webhook_data(
+                data=data, id="test-id", operation="upsert", type="resource"
+            )
+
+        assert sent is False
+
+        # Verify HTTP client was called 3 times (initial + 2 retries)
+        assert mock_http_client.post.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_send_webhook_data_client_error_not_retried(
+        self, port_client: PortClient, mock_http_client: AsyncMock
+    ) -> None:
+        """Test that non-transient client errors are not retried."""
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
+        mock_http_client.post.return_value = httpx.Response(400, request=request)
+
+        data = {"id": "test-resource", "name": "Test Resource"}
+
         await port_client.send_webhook_data(
             data=data, id="test-id", operation="upsert", type="resource"
         )
 
-        # Verify HTTP client was called 3 times (initial + 2 retries)
-        assert mock_http_client.post.call_count == 3
+        assert mock_http_client.post.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_send_webhook_data_respects_retry_after(
+        self, port_client: PortClient, mock_http_client: AsyncMock
+    ) -> None:
+        """Test that a 429 response waits for its Retry-After header."""
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
+        mock_http_client.post.side_effect = [
+            httpx.Response(429, headers={"Retry-After": "0.01"}, request=request),
+            httpx.Response(200, request=request),
+        ]
+
+        data = {"id": "test-resource", "name": "Test Resource"}
+
+        with patch("src.clients.port._backoff") as mock_backoff:
+            await port_client.send_webhook_data(
+                data=data, id="test-id", operation="upsert", type="resource"
+            )
+
+        assert mock_http_client.post.call_count == 2
+        mock_backoff.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_send_webhook_data_releases_slot_during_backoff(
+        self, port_client: PortClient, mock_http_client: AsyncMock
+    ) -> None:
+        """Test that a retrying request frees its slot while backing off."""
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
+        mock_http_client.post.side_effect = [
+            httpx.Response(503, request=request),
+            httpx.Response(200, request=request),
+        ]
+        active: list[int] = []
+
+        def backoff(_: Any) -> float:
+            active.append(port_client.admission.active)
+            return 0
+
+        data = {"id": "test-resource", "name": "Test Resource"}
+
+        with patch("src.clients.port._backoff", side_effect=backoff):
+            await port_client.send_webhook_data(
+                data=data, id="test-id", operation="upsert", type="resource"
+            )
+
+        assert mock_http_client.post.call_count == 2
+        assert active == [0]
+
+    @pytest.mark.asyncio
+    async def test_send_webhook_data_throttling_shrinks_admission(
+        self, port_client: PortClient, mock_http_client: AsyncMock
+    ) -> None:
+        """Test that a 429 response halves the admission limit."""
+        request = httpx.Request("POST", port_client.webhook_ingest_url)
+        mock_http_client.post.side_effect = [
+            httpx.Response(429, headers={"Retry-After": "0"}, request=request),
+            httpx.Response(200, request=request),
+        ]
+        limit = port_client.admission.limit
+
+        await port_client.send_webhook_data(
+            data={"id": "test-resource"}, id="test-id", operation="upsert", type="r"
+        )
+
+        assert port_client.admission.limit == limit // 2
+
+    def test_parse_retry_after(self) -> None:
+        """Test parsing Retry-After headers."""
+        assert _parse_retry_after(None) is None
+        assert _parse_retry_after("2") == 2.0
+        assert _parse_retry_after("3600") == WEBHOOK_MAX_RETRY_AFTER_SECONDS
+        assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert _parse_retry_after("not-a-date") is None
 
     @pytest.mark.asyncio
     async def test_send_webhook_data_concurrent_requests(
@@ -133,10 +250,10 @@ class TestPortClient:
         assert mock_http_client.post.call_count == 5
 
     @pytest.mark.asyncio
-    async def test_send_webhook_data_semaphore_limits(
+    async def test_send_webhook_data_admission_limits(
         self, port_client: PortClient, mock_http_client: AsyncMock
     ) -> None:
-        """Test that semaphore limits concurrent requests."""
+        """Test that the admission controller limits concurrent requests."""
 
         # Mock slow response
         async def slow_response(*args: Any, **kwargs: Any) -> httpx.Response:
@@ -147,9 +264,9 @@ class TestPortClient:
 
         mock_http_client.post.side_effect = slow_response
 
-        # Send more requests than semaphore limit
+        # Send more requests than the admission limit
         tasks = []
-        for i in range(30):  # More than semaphore limit of 25
+        for i in range(30):  # More than the admission limit of 25
             data = {"id": f"test-resource-{i}", "name": f"Test Resource {i}"}
             task = port_client.send_webhook_data(
                 data=data, id=f"test-id-{i}", operation="upsert", type="resource"
@@ -187,5 +304,5 @@ class TestPortClient:
         assert mock_http_client.post.call_count == 2
         calls = mock_http_client.post.call_args_list
 
-        assert calls[0][1]["json"]["operation"] == "upsert"
-        assert calls[1][1]["json"]["operation"] == "delete"
+        assert orjson.loads(calls[0][1]["content"])["operation"] == "upsert"
+        assert orjson.loads(calls[1][1]["content"])["operation"] == "delete"
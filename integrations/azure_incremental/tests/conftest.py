@@ -50,6 +50,7 @@ def mock_port_client() -> AsyncMock:
     """Create a mock Port client."""
     client: AsyncMock = AsyncMock(spec=PortClient)
     client.send_webhook_data = AsyncMock()
+    client.send_webhook_bulk = AsyncMock()
     return client
 
 
@@ -0,0 +1,7 @@
+from typing import Any, Dict, List
+
+
+def changes_for_query(query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Returns the items the delete or the upsert incremental query yields."""
+    deleted = 'changeType == "Delete"' in query
+    return [item for item in items if (item["operation"] == "delete") == deleted]
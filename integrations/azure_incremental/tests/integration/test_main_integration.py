@@ -1,4 +1,5 @@
-from typing import Any, Optional, Sequence, Tuple
+import asyncio
+from typing import Any, AsyncGenerator, Optional, Sequence, Tuple
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -29,7 +30,14 @@ class TestMainIntegration:
         else:
             mock_azure_client.return_value.__aenter__.return_value = mock_azure_instance
             if subscriptions is not None:
-                mock_azure_instance.get_all_subscriptions.return_value = subscriptions
+
+                async def iter_subscriptions() -> AsyncGenerator[Any, None]:
+                    for subscription in subscriptions:
+                        yield subscription
+
+                mock_azure_instance.iter_subscriptions = MagicMock(
+                    side_effect=iter_subscriptions
+                )
         return mock_azure_instance
 
     def _mock_services(
@@ -90,6 +98,8 @@ class TestMainIntegration:
         """Test successful main execution in full mode."""
         mock_app_settings.SYNC_MODE.value = "full"
         mock_app_settings.SUBSCRIPTION_BATCH_SIZE = 10
+        mock_app_settings.SUBSCRIPTION_BATCH_CONCURRENCY = 2
+        mock_app_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
         env: dict[str, str] = {**self.ENV_VARS_BASE, "SYNC_MODE": "full"}
         with patch.dict("os.environ", env):
             mock_sub1 = MagicMock()
@@ -104,6 +114,86 @@ class TestMainIntegration:
             mock_containers_instance.sync_full.assert_called_once()
             mock_resources_instance.sync_full.assert_called_once()
 
+    @pytest.mark.asyncio
+    @patch("src.main.AzureClient")
+    @patch("src.main.PortClient")
+    @patch("src.main.ResourceContainers")
+    @patch("src.main.Resources")
+    @patch("src.main.app_settings")
+    async def test_main_multiple_batches(
+        self,
+        mock_app_settings: Any,
+        mock_resources: Any,
+        mock_containers: Any,
+        mock_port_client: Any,
+        mock_azure_client: Any,
+    ) -> None:
+        """Test that every subscription batch is synced."""
+        mock_app_settings.SYNC_MODE = "full"
+        mock_app_settings.SUBSCRIPTION_BATCH_SIZE = 1
+        mock_app_settings.SUBSCRIPTION_BATCH_CONCURRENCY = 2
+        mock_app_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+        subscriptions = []
+        for i in range(3):
+            sub = MagicMock()
+            sub.subscription_id = f"sub-{i}"
+            subscriptions.append(sub)
+        self._mock_azure_client(mock_azure_client, subscriptions)
+        mock_containers_instance, mock_resources_instance = self._mock_services(
+            mock_containers, mock_resources
+        )
+
+        await main()
+
+        assert mock_containers_instance.sync_full.call_count == 3
+        assert mock_resources_instance.sync_full.call_count == 3
+        synced = sorted(
+            call[0][0][0] for call in mock_resources_instance.sync_full.call_args_list
+        )
+        assert synced == ["sub-0", "sub-1", "sub-2"]
+
+    @pytest.mark.asyncio
+    @patch("src.main.AzureClient")
+    @patch("src.main.PortClient")
+    @patch("src.main.ResourceContainers")
+    @patch("src.main.Resources")
+    @patch("src.main.app_settings")
+    async def test_main_syncs_containers_and_resources_concurrently(
+        self,
+        mock_app_settings: Any,
+        mock_resources: Any,
+        mock_containers: Any,
+        mock_port_client: Any,
+        mock_azure_client: Any,
+    ) -> None:
+        """Test that a batch syncs containers and resources at the same time."""
+        mock_app_settings.SYNC_MODE = "full"
+        mock_app_settings.SUBSCRIPTION_BATCH_SIZE = 10
+        mock_app_settings.SUBSCRIPTION_BATCH_CONCURRENCY = 2
+        mock_app_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+        mock_sub1 = MagicMock()
+        mock_sub1.subscription_id = "sub-1"
+        self._mock_azure_client(mock_azure_client, [mock_sub1])
+        mock_containers_instance, mock_resources_instance = self._mock_services(
+            mock_containers, mock_resources
+        )
+        resources_started = asyncio.Event()
+
+        async def sync_containers(*args: Any) -> None:
+            # Would never finish if the resources sync only started afterwards
+            await resources_started.wait()
+
+        async def sync_resources(*args: Any) -> None:
+            resources_started.set()
+
+        mock_containers_instance.sync_full.side_effect = sync_containers
+        mock_resources_instance.sync_full.side_effect = sync_resources
+
+        await asyncio.wait_for(main(), timeout=1)
+
+        mock_containers_instance.sync_full.assert_called_once_with(["sub-1"])
+        mock_resources_instance.sync_full.assert_called_once()
+
     @pytest.mark.asyncio
     @patch("src.main.AzureClient")
     async def test_main_no_subscriptions(self, mock_azure_client: Any) -> None:
@@ -112,7 +202,7 @@ class TestMainIntegration:
         with patch.dict("os.environ", env):
             mock_azure_instance = self._mock_azure_client(mock_azure_client, [])
             await main()
-            mock_azure_instance.get_all_subscriptions.assert_called_once()
+            mock_azure_instance.iter_subscriptions.assert_called_once()
 
     @pytest.mark.asyncio
     @patch("src.main.AzureClient")
@@ -155,6 +245,8 @@ class TestMainIntegration:
             "microsoft.keyvault/vaults",
         ]
         mock_app_settings.SUBSCRIPTION_BATCH_SIZE = 10
+        mock_app_settings.SUBSCRIPTION_BATCH_CONCURRENCY = 2
+        mock_app_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
 
         env: dict[str, str] = {
             **self.ENV_VARS_BASE,
@@ -172,8 +264,8 @@ class TestMainIntegration:
             await main()
 
             mock_resources_instance.sync_incremental.assert_called_once()
-            call_args = mock_resources_instance.sync_incremental.call_args
-            assert call_args[0][1] == [
+            call_args = mock_resources.call_args
+            assert call_args[0][3] == [
                 "microsoft.network/virtualnetworks",
                 "microsoft.keyvault/vaults",
             ]
@@ -10,6 +10,7 @@ from src.services.resource_containers import (
     build_rg_tag_filter_clause_for_containers,
 )
 from src.settings import ResourceGroupTagFilters
+from tests.helpers import changes_for_query
 
 
 class TestResourceContainersFiltering:
@@ -61,10 +62,18 @@ class TestResourceContainersFiltering:
             )
 
             result = build_incremental_container_query()
+            deletes = build_incremental_container_query(deleted=True)
 
             assert "resourcecontainerchanges" in result
-            assert "ago(15m)" in result
+            assert "| where changeTime > datetime(" in result
             assert "resourcecontainers" in result
+            assert '| where changeType != "Delete"' in result
+            assert 'operation="upsert"' in result
+
+            assert '| where changeType == "Delete"' in deletes
+            assert 'operation="delete"' in deletes
+            assert "type=changeResourceType" in deletes
+            assert "join" not in deletes
 
     def test_build_full_sync_container_query(self) -> None:
         """Test building full sync container query."""
@@ -111,6 +120,7 @@ class TestResourceContainersService:
             mock_settings.get_resource_group_tag_filters.return_value = (
                 ResourceGroupTagFilters(include={"Environment": "Production"})
             )
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
 
             service = ResourceContainers(mock_azure_client, mock_port_client)
             assert service.azure_client == mock_azure_client
@@ -124,11 +134,64 @@ class TestResourceContainersService:
             mock_settings.get_resource_group_tag_filters.return_value = (
                 ResourceGroupTagFilters()
             )
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
 
             service = ResourceContainers(mock_azure_client, mock_port_client)
             assert service.azure_client == mock_azure_client
             assert service.port_client == mock_port_client
 
+    def test_init_skips_delete_query_with_include_filters(
+        self, mock_azure_client: AsyncMock, mock_port_client: AsyncMock
+    ) -> None:
+        """Test that deletes are not queried when include filters are set."""
+        with patch("src.services.resource_containers.app_settings") as mock_settings:
+            mock_settings.get_resource_group_tag_filters.return_value = (
+                ResourceGroupTagFilters(include={"Environment": "Production"})
+            )
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
+
+            service = ResourceContainers(mock_azure_client, mock_port_client)
+
+        assert len(service._incremental_queries) == 1
+        assert 'changeType != "Delete"' in service._incremental_queries[0]
+
+    @pytest.mark.asyncio
+    async def test_sync_reuses_queries_across_batches(
+        self,
+        resource_containers: ResourceContainers,
+        mock_azure_client: AsyncMock,
+    ) -> None:
+        """Test that the queries are built once and reused for every batch."""
+        queries: List[str] = []
+
+        async def mock_run_query(
+            query: str, subscriptions: List[str]
+        ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+            queries.append(query)
+            yield []
+
+        mock_azure_client.run_query = mock_run_query
+
+        with (
+            patch(
+                "src.services.resource_containers.build_full_sync_container_query"
+            ) as mock_full,
+            patch(
+                "src.services.resource_containers.build_incremental_container_query"
+            ) as mock_incremental,
+        ):
+            for subscriptions in (["sub-1"], ["sub-2"]):
+                await resource_containers.sync_full(subscriptions)
+                await resource_containers.sync_incremental(subscriptions)
+
+        mock_full.assert_not_called()
+        mock_incremental.assert_not_called()
+        expected = [
+            resource_containers._full_query,
+            *resource_containers._incremental_queries,
+        ]
+        assert queries == expected * 2
+
     @pytest.mark.asyncio
     async def test_sync_full_success(
         self,
@@ -179,6 +242,36 @@ class TestResourceContainersService:
         assert calls[1][1]["operation"] == "upsert"
         assert calls[1][1]["type"] == "resourceContainer"
 
+    @pytest.mark.asyncio
+    async def test_sync_full_ignores_webhook_batch_size(
+        self,
+        resource_containers: ResourceContainers,
+        mock_azure_client: AsyncMock,
+        mock_port_client: AsyncMock,
+    ) -> None:
+        """Test that containers are sent one per request even in bulk mode."""
+
+        async def mock_run_query(
+            query: str, subscriptions: List[str]
+        ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+            yield [
+                {"resourceId": "/subscriptions/sub", "type": "subscription"},
+                {
+                    "resourceId": "/subscriptions/sub/resourcegroups/rg1",
+                    "type": "microsoft.resources/subscriptions/resourcegroups",
+                },
+            ]
+
+        mock_azure_client.run_query = lambda *a, **kw: mock_run_query(*a, **kw)
+
+        with patch("src.services.webhook.app_settings") as mock_settings:
+            mock_settings.PORT_WEBHOOK_BATCH_SIZE = 50
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+            await resource_containers.sync_full(["sub"])
+
+        assert mock_port_client.send_webhook_data.call_count == 2
+        mock_port_client.send_webhook_bulk.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_sync_full_empty_results(
         self,
@@ -215,28 +308,33 @@ class TestResourceContainersService:
         async def mock_run_query(
             query: str, subscriptions: List[str]
         ) -> AsyncGenerator[List[Dict[str, Any]], None]:
-            yield [
-                {
-                    "resourceId": "/subscriptions/sub/resourcegroups/rg1",
-                    "name": "rg1",
-                    "type": "microsoft.resources/subscriptions/resourcegroups",
-                    "location": "eastus",
-                    "tags": {"Environment": "Production"},
-                    "subscriptionId": "sub",
-                    "resourceGroup": "rg1",
-                    "changeType": "Create",
-                },
-                {
-                    "resourceId": "/subscriptions/sub/resourcegroups/rg2",
-                    "name": "rg2",
-                    "type": "microsoft.resources/subscriptions/resourcegroups",
-                    "location": "westus",
-                    "tags": {"Environment": "Development"},
-                    "subscriptionId": "sub",
-                    "resourceGroup": "rg2",
-                    "changeType": "Delete",
-                },
-            ]
+            yield changes_for_query(
+                query,
+                [
+                    {
+                        "resourceId": "/subscriptions/sub/resourcegroups/rg1",
+                        "name": "rg1",
+                        "type": "microsoft.resources/subscriptions/resourcegroups",
+                        "location": "eastus",
+                        "tags": {"Environment": "Production"},
+                        "subscriptionId": "sub",
+                        "resourceGroup": "rg1",
+                        "changeType": "Create",
+                        "operation": "upsert",
+                    },
+                    {
+                        "resourceId": "/subscriptions/sub/resourcegroups/rg2",
+                        "name": "rg2",
+                        "type": "microsoft.resources/subscriptions/resourcegroups",
+                        "location": "westus",
+                        "tags": {"Environment": "Development"},
+                        "subscriptionId": "sub",
+                        "resourceGroup": "rg2",
+                        "changeType": "Delete",
+                        "operation": "delete",
+                    },
+                ],
+            )
 
         mock_azure_client.run_query = lambda *a, **kw: mock_run_query(*a, **kw)
 
@@ -247,12 +345,13 @@ class TestResourceContainersService:
         # Verify Port client was called for each resource
         assert mock_port_client.send_webhook_data.call_count == 2
 
-        # Verify the calls were made with correct data
+        # Deletes and upserts come from separate concurrent queries
         calls = mock_port_client.send_webhook_data.call_args_list
-        assert calls[0][1]["operation"] == "upsert"  # Create
-        assert calls[0][1]["type"] == "resourceContainer"
-        assert calls[1][1]["operation"] == "delete"  # Delete
-        assert calls[1][1]["type"] == "resourceContainer"
+        sent = sorted((call[1]["operation"], call[1]["type"]) for call in calls)
+        assert sent == [
+            ("delete", "resourceContainer"),
+            ("upsert", "resourceContainer"),
+        ]
 
     @pytest.mark.asyncio
     async def test_sync_incremental_empty_results(
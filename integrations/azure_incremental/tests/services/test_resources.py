@@ -7,9 +7,11 @@ from src.services.resources import (
     Resources,
     build_full_sync_query,
     build_incremental_query,
+    build_resource_group_join,
     build_rg_tag_filter_clause,
 )
 from src.settings import ResourceGroupTagFilters
+from tests.helpers import changes_for_query
 
 
 class TestResourcesFiltering:
@@ -61,11 +63,57 @@ class TestResourcesFiltering:
             )
 
             result = build_incremental_query()
+            deletes = build_incremental_query(deleted=True)
 
             assert "resourcechanges" in result
-            assert "ago(15m)" in result
+            assert "| where changeTime > datetime(" in result
             assert "resources" in result
             assert "resourcecontainers" in result
+            assert '| where changeType != "Delete"' in result
+            assert 'operation="upsert"' in result
+
+            assert '| where changeType == "Delete"' in deletes
+            assert 'operation="delete"' in deletes
+            assert "join" not in deletes
+
+    def test_build_incremental_delete_query_with_filters(self) -> None:
+        """Test that deletes join resource groups only to filter on their tags."""
+        with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
+            mock_settings.get_resource_group_tag_filters.return_value = (
+                ResourceGroupTagFilters(include={"Environment": "Production"})
+            )
+
+            deletes = build_incremental_query(deleted=True)
+
+        assert "resourcecontainers" in deletes
+        assert "join kind=inner" in deletes
+        assert "tostring(tags['Environment']) =~ 'Production'" in deletes
+        assert "sourceResourceId" not in deletes
+
+    def test_build_resource_group_join(self) -> None:
+        """Test that include filters prune resource groups before an inner join."""
+        join = build_resource_group_join(ResourceGroupTagFilters())
+        assert "join kind=leftouter" in join
+        assert "tostring(" not in join
+
+        join = build_resource_group_join(
+            ResourceGroupTagFilters(exclude={"Temporary": "true"})
+        )
+        assert "join kind=leftouter" in join
+        assert "| where not (tostring(rgTags['Temporary']) =~ 'true')" in join
+        assert join.index("rgTags=tags") < join.index("rgTags['Temporary']")
+
+        join = build_resource_group_join(
+            ResourceGroupTagFilters(
+                include={"Environment": "Production"}, exclude={"Temporary": "true"}
+            )
+        )
+        assert "join kind=inner" in join
+        assert "| where (tostring(tags['Environment']) =~ 'Production')" in join
+        assert "rgTags['Environment']" not in join
+        assert join.index("tags['Environment']") < join.index("rgTags=tags")
+        assert join.index("rgTags=tags") < join.index("rgTags['Temporary']")
 
     def test_build_incremental_query_with_resource_types(self) -> None:
         """Test building incremental query with resource types."""
@@ -82,9 +130,61 @@ class TestResourcesFiltering:
             result = build_incremental_query(resource_types)
 
             assert "resourcechanges" in result
-            assert "ago(15m)" in result
-            assert "type == 'microsoft.network/virtualnetworks'" in result
-            assert "type == 'microsoft.keyvault/vaults'" in result
+            assert "| where changeTime > datetime(" in result
+            assert (
+                "| where type in~ ('microsoft.keyvault/vaults', "
+                "'microsoft.network/virtualnetworks')" in result
+            )
+            assert result is build_incremental_query(
+                ["Microsoft.Network/virtualNetworks", "microsoft.keyvault/vaults"]
+            )
+
+    def test_build_incremental_query_changed_properties(self) -> None:
+        """Test that changedProperties is only projected when enabled."""
+        with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
+            mock_settings.get_resource_group_tag_filters.return_value = (
+                ResourceGroupTagFilters()
+            )
+
+            mock_settings.INCLUDE_CHANGED_PROPERTIES = False
+            without_changes = build_incremental_query()
+            mock_settings.INCLUDE_CHANGED_PROPERTIES = True
+            with_changes = build_incremental_query()
+
+        assert "changeTime, rgTags" in without_changes
+        assert "changeTime, changedProperties, rgTags" in with_changes
+
+    def test_build_incremental_query_is_memoized(self) -> None:
+        """Test that identical inputs render the query only once."""
+        with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
+            mock_settings.get_resource_group_tag_filters.return_value = (
+                ResourceGroupTagFilters()
+            )
+
+            first = build_incremental_query(["microsoft.keyvault/vaults"])
+            second = build_incremental_query(["microsoft.keyvault/vaults"])
+
+            mock_settings.CHANGE_WINDOW_MINUTES = 30
+            other_window = build_incremental_query(["microsoft.keyvault/vaults"])
+
+        assert first is second
+        assert other_window != first
+
+    def test_build_full_sync_query_is_memoized(self) -> None:
+        """Test that the full sync query is rendered once per input."""
+        with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.get_resource_group_tag_filters.return_value = (
+                ResourceGroupTagFilters()
+            )
+
+            first = build_full_sync_query(["microsoft.keyvault/vaults"])
+            second = build_full_sync_query(["microsoft.keyvault/vaults"])
+            other_types = build_full_sync_query(["microsoft.web/sites"])
+
+        assert first is second
+        assert other_types != first
 
     def test_build_full_sync_query_no_resource_types(self) -> None:
         """Test building full sync query without resource types."""
@@ -110,7 +210,7 @@ class TestResourcesFiltering:
             result = build_full_sync_query(resource_types)
 
             assert "resources" in result
-            assert "type == 'microsoft.network/virtualnetworks'" in result
+            assert "type in~ ('microsoft.network/virtualnetworks')" in result
 
 
 class TestResourcesService:
@@ -142,6 +242,7 @@ class TestResourcesService:
     ) -> None:
         """Test initialization with tag filters."""
         with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
             mock_settings.get_resource_group_tag_filters.return_value = (
                 ResourceGroupTagFilters(include={"Environment": "Production"})
             )
@@ -155,6 +256,7 @@ class TestResourcesService:
     ) -> None:
         """Test initialization without tag filters."""
         with patch("src.services.resources.app_settings") as mock_settings:
+            mock_settings.CHANGE_WINDOW_MINUTES = 15
             mock_settings.get_resource_group_tag_filters.return_value = (
                 ResourceGroupTagFilters()
             )
@@ -218,7 +320,6 @@ class TestResourcesService:
     @pytest.mark.asyncio
     async def test_sync_full_with_resource_types(
         self,
-        resources_service: Resources,
         mock_azure_client: AsyncMock,
         mock_port_client: AsyncMock,
     ) -> None:
@@ -246,7 +347,10 @@ class TestResourcesService:
         subscriptions: List[str] = ["sub-1"]
         resource_types: List[str] = ["microsoft.network/virtualnetworks"]
 
-        await resources_service.sync_full(subscriptions, resource_types)
+        resources_service = Resources(
+            mock_azure_client, mock_port_client, resource_types=resource_types
+        )
+        await resources_service.sync_full(subscriptions)
 
         # Verify Port client was called
         assert mock_port_client.send_webhook_data.call_count == 1
@@ -292,30 +396,35 @@ class TestResourcesService:
         async def mock_run_query(
             query: str, subscriptions: List[str]
         ) -> AsyncGenerator[List[Dict[str, Any]], None]:
-            yield [
-                {
-                    "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.network/virtualnetworks/vnet1",
-                    "name": "vnet1",
-                    "type": "microsoft.network/virtualnetworks",
-                    "location": "eastus",
-                    "tags": {"Environment": "Production"},
-                    "subscriptionId": "sub",
-                    "resourceGroup": "rg",
-                    "rgTags": {"Environment": "Production"},
-                    "changeType": "Create",
-                },
-                {
-                    "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.keyvault/vaults/kv1",
-                    "name": "kv1",
-                    "type": "microsoft.keyvault/vaults",
-                    "location": "westus",
-                    "tags": {"Environment": "Development"},
-                    "subscriptionId": "sub",
-                    "resourceGroup": "rg",
-                    "rgTags": {"Environment": "Development"},
-                    "changeType": "Delete",
-                },
-            ]
+            yield changes_for_query(
+                query,
+                [
+                    {
+                        "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.network/virtualnetworks/vnet1",
+                        "name": "vnet1",
+                        "type": "microsoft.network/virtualnetworks",
+                        "location": "eastus",
+                        "tags": {"Environment": "Production"},
+                        "subscriptionId": "sub",
+                        "resourceGroup": "rg",
+                        "rgTags": {"Environment": "Production"},
+                        "changeType": "Create",
+                        "operation": "upsert",
+                    },
+                    {
+                        "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.keyvault/vaults/kv1",
+                        "name": "kv1",
+                        "type": "microsoft.keyvault/vaults",
+                        "location": "westus",
+                        "tags": {"Environment": "Development"},
+                        "subscriptionId": "sub",
+                        "resourceGroup": "rg",
+                        "rgTags": {"Environment": "Development"},
+                        "changeType": "Delete",
+                        "operation": "delete",
+                    },
+                ],
+            )
 
         mock_azure_client.run_query = lambda *a, **kw: mock_run_query(*a, **kw)
 
@@ -326,17 +435,14 @@ class TestResourcesService:
         # Verify Port client was called for each resource
         assert mock_port_client.send_webhook_data.call_count == 2
 
-        # Verify the calls were made with correct data
+        # Deletes and upserts come from separate concurrent queries
         calls = mock_port_client.send_webhook_data.call_args_list
-        assert calls[0][1]["operation"] == "upsert"  # Create
-        assert calls[0][1]["type"] == "resource"
-        assert calls[1][1]["operation"] == "delete"  # Delete
-        assert calls[1][1]["type"] == "resource"
+        sent = sorted((call[1]["operation"], call[1]["type"]) for call in calls)
+        assert sent == [("delete", "resource"), ("upsert", "resource")]
 
     @pytest.mark.asyncio
     async def test_sync_incremental_with_resource_types(
         self,
-        resources_service: Resources,
         mock_azure_client: AsyncMock,
         mock_port_client: AsyncMock,
     ) -> None:
@@ -346,26 +452,33 @@ class TestResourcesService:
         async def mock_run_query(
             query: str, subscriptions: List[str]
         ) -> AsyncGenerator[List[Dict[str, Any]], None]:
-            yield [
-                {
-                    "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.network/virtualnetworks/vnet1",
-                    "name": "vnet1",
-                    "type": "microsoft.network/virtualnetworks",
-                    "location": "eastus",
-                    "tags": {"Environment": "Production"},
-                    "subscriptionId": "sub",
-                    "resourceGroup": "rg",
-                    "rgTags": {"Environment": "Production"},
-                    "changeType": "Create",
-                }
-            ]
+            yield changes_for_query(
+                query,
+                [
+                    {
+                        "resourceId": "/subscriptions/sub/resourcegroups/rg/providers/microsoft.network/virtualnetworks/vnet1",
+                        "name": "vnet1",
+                        "type": "microsoft.network/virtualnetworks",
+                        "location": "eastus",
+                        "tags": {"Environment": "Production"},
+                        "subscriptionId": "sub",
+                        "resourceGroup": "rg",
+                        "rgTags": {"Environment": "Production"},
+                        "changeType": "Create",
+                        "operation": "upsert",
+                    }
+                ],
+            )
 
         mock_azure_client.run_query = lambda *a, **kw: mock_run_query(*a, **kw)
 
         subscriptions: List[str] = ["sub-1"]
         resource_types: List[str] = ["microsoft.network/virtualnetworks"]
 
-        await resources_service.sync_incremental(subscriptions, resource_types)
+        resources_service = Resources(
+            mock_azure_client, mock_port_client, resource_types=resource_types
+        )
+        await resources_service.sync_incremental(subscriptions)
 
         # Verify Port client was called
         assert mock_port_client.send_webhook_data.call_count == 1
@@ -0,0 +1,76 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from src.services.sent_changes import SentChanges
+
+
+class TestSentChanges:
+    """Test remembering the changes already sent to Port."""
+
+    def test_is_sent_matches_change_time(self) -> None:
+        """Test that only the exact recorded change counts as sent."""
+        sent_changes = SentChanges()
+        sent_changes.mark_sent({"resourceId": "a", "changeTime": "t1"})
+
+        assert sent_changes.is_sent({"resourceId": "a", "changeTime": "t1"})
+        assert not sent_changes.is_sent({"resourceId": "a", "changeTime": "t2"})
+        assert not sent_changes.is_sent({"resourceId": "b", "changeTime": "t1"})
+
+    def test_evicts_least_recently_sent(self) -> None:
+        """Test that the oldest entries are dropped past the max size."""
+        sent_changes = SentChanges(max_size=2)
+        sent_changes.mark_sent({"resourceId": "a", "changeTime": "t1"})
+        sent_changes.mark_sent({"resourceId": "b", "changeTime": "t1"})
+        sent_changes.mark_sent({"resourceId": "a", "changeTime": "t2"})
+        sent_changes.mark_sent({"resourceId": "c", "changeTime": "t1"})
+
+        assert len(sent_changes) == 2
+        assert sent_changes.is_sent({"resourceId": "a", "changeTime": "t2"})
+        assert not sent_changes.is_sent({"resourceId": "b", "changeTime": "t1"})
+
+    def test_load_disabled(self) -> None:
+        """Test that nothing is loaded without SENT_CHANGES_CACHE_FILE."""
+        with patch("src.services.sent_changes.app_settings") as mock_settings:
+            mock_settings.SENT_CHANGES_CACHE_FILE = None
+            assert SentChanges.load() is None
+
+    def test_save_and_load(self, tmp_path: Path) -> None:
+        """Test that sent changes survive between runs."""
+        with patch("src.services.sent_changes.app_settings") as mock_settings:
+            mock_settings.SENT_CHANGES_CACHE_FILE = str(tmp_path / "sent.json")
+
+            first_run = SentChanges.load()
+            assert first_run is not None
+            assert len(first_run) == 0
+            first_run.mark_sent({"resourceId": "a", "changeTime": "t1"})
+            first_run.save()
+
+            second_run = SentChanges.load()
+
+        assert second_run is not None
+        assert second_run.is_sent({"resourceId": "a", "changeTime": "t1"})
+
+    def test_load_corrupt_file(self, tmp_path: Path) -> None:
+        """Test that an unreadable cache starts empty."""
+        cache_file = tmp_path / "sent.json"
+        cache_file.write_text("not json")
+
+        with patch("src.services.sent_changes.app_settings") as mock_settings:
+            mock_settings.SENT_CHANGES_CACHE_FILE = str(cache_file)
+            sent_changes = SentChanges.load()
+
+        assert sent_changes is not None
+        assert len(sent_changes) == 0
+
+    def test_load_non_object_file(self, tmp_path: Path) -> None:
+        """Test that a cache holding valid JSON other than an object starts empty."""
+        cache_file = tmp_path / "sent.json"
+
+        for content in ("[]", "1", '[["a", "t1", "extra"]]'):
+            cache_file.write_text(content)
+            with patch("src.services.sent_changes.app_settings") as mock_settings:
+                mock_settings.SENT_CHANGES_CACHE_FILE = str(cache_file)
+                sent_changes = SentChanges.load()
+
+            assert sent_changes is not None
+            assert len(sent_changes) == 0
@@ -0,0 +1,125 @@
+from typing import Any, Dict, List
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.services.sent_changes import SentChanges
+from src.services.webhook import (
+    change_operation,
+    send_items_to_webhook,
+    upsert_operation,
+    webhook_task_pool,
+)
+
+
+class TestSendItemsToWebhook:
+    """Test dispatching query results to the Port webhook."""
+
+    @pytest.fixture
+    def items(self) -> List[Dict[str, Any]]:
+        """Change items with a mix of operations."""
+        return [
+            {"resourceId": "/subscriptions/sub/a", "operation": "upsert"},
+            {"resourceId": "/subscriptions/sub/b", "operation": "delete"},
+            {"resourceId": "/subscriptions/sub/c", "operation": "upsert"},
+        ]
+
+    def test_operations(self) -> None:
+        """Test the operation resolvers."""
+        assert upsert_operation({"operation": "delete"}) == "upsert"
+        assert change_operation({"operation": "delete"}) == "delete"
+        assert change_operation({"operation": "upsert"}) == "upsert"
+
+    @pytest.mark.asyncio
+    async def test_sends_one_request_per_item(
+        self, mock_port_client: AsyncMock, items: List[Dict[str, Any]]
+    ) -> None:
+        """Test the default per-item dispatch."""
+        with patch("src.services.webhook.app_settings") as mock_settings:
+            mock_settings.PORT_WEBHOOK_BATCH_SIZE = 1
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+            async with webhook_task_pool() as pool:
+                await send_items_to_webhook(
+                    pool, mock_port_client, items, "resource", change_operation
+                )
+
+        assert mock_port_client.send_webhook_data.call_count == 3
+        mock_port_client.send_webhook_bulk.assert_not_called()
+        calls = mock_port_client.send_webhook_data.call_args_list
+        assert calls[1][1]["id"] == "/subscriptions/sub/b"
+        assert calls[1][1]["operation"] == "delete"
+
+    @pytest.mark.asyncio
+    async def test_sends_bulk_requests_grouped_by_operation(
+        self, mock_port_client: AsyncMock, items: List[Dict[str, Any]]
+    ) -> None:
+        """Test bulk dispatch groups items by operation and chunks them."""
+        with patch("src.services.webhook.app_settings") as mock_settings:
+            mock_settings.PORT_WEBHOOK_BATCH_SIZE = 50
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+            async with webhook_task_pool() as pool:
+                await send_items_to_webhook(
+                    pool, mock_port_client, items * 40, "resource", change_operation
+                )
+
+        mock_port_client.send_webhook_data.assert_not_called()
+        calls = mock_port_client.send_webhook_bulk.call_args_list
+        sent = [(call[0][1], len(call[0][0])) for call in calls]
+        assert sent == [("upsert", 50), ("upsert", 30), ("delete", 40)]
+        assert all(call[0][2] == "resource" for call in calls)
+
+    @pytest.mark.asyncio
+    async def test_sends_one_request_per_item_without_bulk(
+        self, mock_port_client: AsyncMock, items: List[Dict[str, Any]]
+    ) -> None:
+        """Test that bulk=False ignores PORT_WEBHOOK_BATCH_SIZE."""
+        with patch("src.services.webhook.app_settings") as mock_settings:
+            mock_settings.PORT_WEBHOOK_BATCH_SIZE = 50
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+            async with webhook_task_pool() as pool:
+                await send_items_to_webhook(
+                    pool,
+                    mock_port_client,
+                    items,
+                    "resourceContainer",
+                    change_operation,
+                    bulk=False,
+                )
+
+        assert mock_port_client.send_webhook_data.call_count == 3
+        mock_port_client.send_webhook_bulk.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_skips_and_records_sent_changes(
+        self, mock_port_client: AsyncMock
+    ) -> None:
+        """Test that sent changes are skipped and accepted ones recorded."""
+        items = [
+            {"resourceId": "a", "changeTime": "t1", "operation": "upsert"},
+            {"resourceId": "b", "changeTime": "t1", "operation": "upsert"},
+            {"resourceId": "c", "changeTime": "t1", "operation": "delete"},
+        ]
+        sent_changes = SentChanges()
+        sent_changes.mark_sent(items[0])
+        # Port rejects the request for "c"
+        mock_port_client.send_webhook_data.side_effect = [True, False]
+
+        with patch("src.services.webhook.app_settings") as mock_settings:
+            mock_settings.PORT_WEBHOOK_BATCH_SIZE = 1
+            mock_settings.PORT_MAX_CONCURRENT_REQUESTS = 25
+            async with webhook_task_pool() as pool:
+                await send_items_to_webhook(
+                    pool,
+                    mock_port_client,
+                    items,
+                    "resource",
+                    change_operation,
+                    sent_changes,
+                )
+
+        sent_ids = [
+            call[1]["id"] for call in mock_port_client.send_webhook_data.call_args_list
+        ]
+        assert sent_ids == ["b", "c"]
+        assert sent_changes.is_sent(items[1])
+        assert not sent_changes.is_sent(items[2])
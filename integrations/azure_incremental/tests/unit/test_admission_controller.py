@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from src.admission_controller import AdmissionController
+
+
+class TestAdmissionController:
+    """Test the AdmissionController class."""
+
+    def test_init(self) -> None:
+        """Test controller initialization."""
+        controller = AdmissionController(4)
+        assert controller.limit == 4
+        assert controller.max_limit == 4
+        assert controller.active == 0
+
+    def test_init_rejects_non_positive_limit(self) -> None:
+        """Test that the limit must be positive."""
+        with pytest.raises(ValueError, match="limit must be positive"):
+            AdmissionController(0)
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self) -> None:
+        """Test that no more than limit holders run at once."""
+        controller = AdmissionController(2)
+        peak = 0
+
+        async def work() -> None:
+            nonlocal peak
+            async with controller:
+                peak = max(peak, controller.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work() for _ in range(6)))
+
+        assert peak == 2
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_release_on_exception(self) -> None:
+        """Test that a failing holder frees its slot."""
+        controller = AdmissionController(1)
+
+        with pytest.raises(RuntimeError):
+            async with controller:
+                raise RuntimeError("boom")
+
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_resize_up_admits_waiters(self) -> None:
+        """Test that growing the limit wakes waiting acquirers."""
+        controller = AdmissionController(4)
+        await controller.resize(1)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await controller.resize(2)
+        await asyncio.wait_for(waiter, timeout=1)
+
+        assert controller.active == 2
+
+    @pytest.mark.asyncio
+    async def test_resize_is_bounded(self) -> None:
+        """Test that the limit stays between 1 and the initial limit."""
+        controller = AdmissionController(4)
+        await controller.resize(0)
+        assert controller.limit == 1
+        await controller.resize(10)
+        assert controller.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_throttling_halves_limit(self) -> None:
+        """Test that each throttle of a new generation halves the limit, down to 1."""
+        controller = AdmissionController(8)
+        await controller.on_throttled(controller.generation)
+        assert controller.limit == 4
+        for _ in range(5):
+            await controller.on_throttled(controller.generation)
+        assert controller.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_throttles_halve_once(self) -> None:
+        """Test that requests throttled together halve the limit only once."""
+        controller = AdmissionController(8)
+        admitted = asyncio.Event()
+
+        async def throttled_request() -> None:
+            async with controller as generation:
+                await admitted.wait()
+            await controller.on_throttled(generation)
+
+        requests = [asyncio.create_task(throttled_request()) for _ in range(8)]
+        await asyncio.sleep(0)
+        assert controller.active == 8
+        admitted.set()
+        await asyncio.gather(*requests)
+
+        assert controller.limit == 4
+        assert controller.generation == 1
+
+        # A request admitted after the halving can halve the limit again
+        async with controller as generation:
+            pass
+        await controller.on_throttled(generation)
+        assert controller.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_success_ramps_limit_back_up(self) -> None:
+        """Test that a full window of successes grows the limit by one."""
+        controller = AdmissionController(8)
+        await controller.on_throttled(controller.generation)
+
+        for _ in range(3):
+            await controller.on_success()
+        assert controller.limit == 4
+        await controller.on_success()
+        assert controller.limit == 5
+
+        for _ in range(100):
+            await controller.on_success()
+        assert controller.limit == 8
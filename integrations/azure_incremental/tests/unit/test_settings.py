@@ -1,7 +1,10 @@
 from typing import Any, Dict
 from unittest.mock import patch
 
-from src.settings import ResourceGroupTagFilters, app_settings
+import pytest
+from pydantic import ValidationError
+
+from src.settings import ResourceGroupTagFilters, _AppSettings, app_settings
 
 
 class TestResourceGroupTagFilters:
@@ -85,6 +88,37 @@ class TestAppSettings:
         assert app_settings.SUBSCRIPTION_BATCH_SIZE == 1000
         assert app_settings.SYNC_MODE == "incremental"
 
+    def test_arg_page_size_bounds(self) -> None:
+        """Test that ARG_PAGE_SIZE must fit a Resource Graph page."""
+        assert _AppSettings(ARG_PAGE_SIZE=1).ARG_PAGE_SIZE == 1
+        for page_size in (0, -5, 1001):
+            with pytest.raises(ValidationError):
+                _AppSettings(ARG_PAGE_SIZE=page_size)
+
+    def test_subscription_batch_concurrency_bounds(self) -> None:
+        """Test that SUBSCRIPTION_BATCH_CONCURRENCY must be positive."""
+        settings = _AppSettings(SUBSCRIPTION_BATCH_CONCURRENCY=1)
+        assert settings.SUBSCRIPTION_BATCH_CONCURRENCY == 1
+        for value in (0, -1):
+            with pytest.raises(ValidationError):
+                _AppSettings(SUBSCRIPTION_BATCH_CONCURRENCY=value)
+
+    def test_arg_max_concurrent_queries_bounds(self) -> None:
+        """Test that ARG_MAX_CONCURRENT_QUERIES must be positive."""
+        settings = _AppSettings(ARG_MAX_CONCURRENT_QUERIES=1)
+        assert settings.ARG_MAX_CONCURRENT_QUERIES == 1
+        for value in (0, -1):
+            with pytest.raises(ValidationError):
+                _AppSettings(ARG_MAX_CONCURRENT_QUERIES=value)
+
+    def test_port_max_concurrent_requests_bounds(self) -> None:
+        """Test that PORT_MAX_CONCURRENT_REQUESTS must be positive."""
+        settings = _AppSettings(PORT_MAX_CONCURRENT_REQUESTS=1)
+        assert settings.PORT_MAX_CONCURRENT_REQUESTS == 1
+        for value in (0, -1):
+            with pytest.raises(ValidationError):
+                _AppSettings(PORT_MAX_CONCURRENT_REQUESTS=value)
+
     def test_get_resource_group_tag_filters_empty(self) -> None:
         """Test getting empty tag filters."""
         app_settings.RESOURCE_GROUP_TAG_FILTERS = None
@@ -121,6 +155,15 @@ class TestAppSettings:
         assert filters.exclude == {"Temporary": "true"}
         assert filters.has_filters()
 
+    def test_get_resource_group_tag_filters_parses_once(self) -> None:
+        """Test that the filters are only parsed again when the JSON changes."""
+        app_settings.RESOURCE_GROUP_TAG_FILTERS = '{"include": {"Env": "Prod"}}'
+        filters = app_settings.get_resource_group_tag_filters()
+        assert app_settings.get_resource_group_tag_filters() is filters
+
+        app_settings.RESOURCE_GROUP_TAG_FILTERS = '{"include": {"Env": "Dev"}}'
+        assert app_settings.get_resource_group_tag_filters().include == {"Env": "Dev"}
+
     def test_get_resource_group_tag_filters_invalid_json(self) -> None:
         """Test handling invalid JSON."""
         app_settings.RESOURCE_GROUP_TAG_FILTERS = "invalid json"
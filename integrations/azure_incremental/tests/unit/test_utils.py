@@ -1,6 +1,23 @@
-from typing import Any, Dict, List
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncGenerator, Dict, List
 
-from src.utils import turn_sequence_to_chunks
+import pytest
+
+from src.utils import (
+    BoundedTaskPool,
+    build_resource_type_filter,
+    build_tag_filter_clause,
+    canonicalize_kql,
+    get_change_window_start,
+    turn_async_iterable_to_chunks,
+    turn_sequence_to_chunks,
+)
+
+
+async def _async_range(n: int) -> AsyncGenerator[int, None]:
+    for i in range(n):
+        yield i
 
 
 class TestUtils:
@@ -50,16 +67,25 @@ class TestUtils:
         assert result == [[1], [2], [3]]
 
     def test_turn_sequence_to_chunks_chunk_size_zero(self) -> None:
-        """Test chunking with chunk size of 0 (returns empty list)."""
-        sequence: List[int] = [1, 2, 3]
-        result: List[List[int]] = list(turn_sequence_to_chunks(sequence, 0))
-        assert result == []  # When chunk_size is 0, returns empty list
+        """Test that a chunk size of 0 is rejected."""
+        with pytest.raises(ValueError):
+            list(turn_sequence_to_chunks([1, 2, 3], 0))
+        with pytest.raises(ValueError):
+            list(turn_sequence_to_chunks(iter([1, 2, 3]), 0))
 
     def test_turn_sequence_to_chunks_chunk_size_negative(self) -> None:
-        """Test chunking with negative chunk size (returns partial chunks)."""
-        sequence: List[int] = [1, 2, 3]
-        result: List[List[int]] = list(turn_sequence_to_chunks(sequence, -1))
-        assert result == [[1, 2]]  # Negative chunk size behaves like small positive
+        """Test that a negative chunk size is rejected."""
+        with pytest.raises(ValueError):
+            list(turn_sequence_to_chunks([1, 2, 3], -1))
+        with pytest.raises(ValueError):
+            list(turn_sequence_to_chunks(iter([1, 2, 3]), -1))
+
+    def test_turn_sequence_to_chunks_iterable(self) -> None:
+        """Test chunking a lazy iterable."""
+        result: List[List[int]] = list(
+            turn_sequence_to_chunks((i for i in range(7)), 3)
+        )
+        assert result == [[0, 1, 2], [3, 4, 5], [6]]
 
     def test_turn_sequence_to_chunks_large_sequence(self) -> None:
         """Test chunking a large sequence."""
@@ -68,3 +94,137 @@ class TestUtils:
         assert len(result) == 10
         assert all(len(chunk) == 100 for chunk in result[:-1])
         assert len(result[-1]) == 100  # Last chunk is full due to implementation logic
+
+    @pytest.mark.asyncio
+    async def test_turn_async_iterable_to_chunks(self) -> None:
+        """Test chunking an async iterable with a partial last chunk."""
+        result = [
+            chunk async for chunk in turn_async_iterable_to_chunks(_async_range(7), 3)
+        ]
+        assert result == [[0, 1, 2], [3, 4, 5], [6]]
+
+    @pytest.mark.asyncio
+    async def test_turn_async_iterable_to_chunks_empty(self) -> None:
+        """Test chunking an empty async iterable yields no chunks."""
+        result = [
+            chunk async for chunk in turn_async_iterable_to_chunks(_async_range(0), 3)
+        ]
+        assert result == []
+
+    def test_get_change_window_start(self) -> None:
+        """Test the change window start is a minute-aligned KQL literal."""
+        get_change_window_start.cache_clear()
+        literal = get_change_window_start(15)
+
+        start = datetime.strptime(literal, "datetime(%Y-%m-%dT%H:%M:%SZ)").replace(
+            tzinfo=timezone.utc
+        )
+        expected = datetime.now(timezone.utc) - timedelta(minutes=15)
+        assert start.second == 0
+        assert timedelta(0) <= expected - start < timedelta(minutes=2)
+        assert get_change_window_start(15) is literal
+
+    def test_canonicalize_kql(self) -> None:
+        """Test whitespace and comments collapse outside string literals."""
+        query = """
+            resources  // all resources
+            | where name == 'a  b // c'
+            | project   name ,  type
+        """
+        assert (
+            canonicalize_kql(query)
+            == "resources | where name == 'a  b // c' | project name , type"
+        )
+
+    def test_build_tag_filter_clause(self) -> None:
+        """Test the tag filter clause for a given tags column."""
+        assert build_tag_filter_clause({}, {}, "tags") == ""
+        assert build_tag_filter_clause(
+            {"Env": "Prod", "Team": "O'Neil"}, {"Temp": "true"}, "rgTags"
+        ) == (
+            "| where (tostring(rgTags['Env']) =~ 'Prod' and "
+            "tostring(rgTags['Team']) =~ 'O''Neil') and "
+            "not (tostring(rgTags['Temp']) =~ 'true')"
+        )
+
+    def test_build_resource_type_filter(self) -> None:
+        """Test the resource type clause quotes and escapes each type."""
+        assert build_resource_type_filter(()) == ""
+        assert build_resource_type_filter(
+            ["Microsoft.Compute/virtualMachines", "a'b"]
+        ) == ("| where type in~ ('Microsoft.Compute/virtualMachines', 'a''b')")
+
+    def test_build_tag_filter_clause_is_memoized(self) -> None:
+        """Test that equal filters reuse the same clause string."""
+        first = build_tag_filter_clause({"Env": "Prod"}, {}, "tags")
+        second = build_tag_filter_clause({"Env": "Prod"}, {}, "tags")
+        assert first is second
+
+    @pytest.mark.asyncio
+    async def test_bounded_task_pool(self) -> None:
+        """Test that no more than `limit` coroutines run at once."""
+        running = 0
+        peak = 0
+        finished = []
+
+        async def work(i: int) -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001 * (i % 3))
+            running -= 1
+            finished.append(i)
+
+        async with BoundedTaskPool(4) as pool:
+            for i in range(20):
+                await pool.submit(work(i))
+
+        assert peak == 4
+        assert sorted(finished) == list(range(20))
+
+    @pytest.mark.asyncio
+    async def test_bounded_task_pool_propagates_errors(self) -> None:
+        """Test that a failing coroutine raises and cancels the others."""
+        cancelled = []
+
+        async def slow() -> None:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def fail() -> None:
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async with BoundedTaskPool(2) as pool:
+                for job in (slow, fail, slow):
+                    await pool.submit(job())
+
+        await asyncio.sleep(0)
+        assert cancelled
+
+    @pytest.mark.asyncio
+    async def test_bounded_task_pool_waits_for_cancelled_tasks(self) -> None:
+        """Test that leaving the pool on an error waits for cancelled tasks."""
+        cleaned_up = []
+
+        async def slow() -> None:
+            try:
+                await asyncio.sleep(1)
+            finally:
+                # Cleanup that needs the event loop, like closing a response
+                await asyncio.sleep(0)
+                cleaned_up.append(True)
+
+        async def fail() -> None:
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async with BoundedTaskPool(3) as pool:
+                for job in (slow, slow, fail):
+                    await pool.submit(job())
+                await asyncio.sleep(0.01)
+
+        assert cleaned_up == [True, True]